@@ -0,0 +1,442 @@
+import contextvars
+import time
+from datetime import datetime
+
+from cache_llm import cache_padrao
+from cliente_openai import obter_cliente
+from coalescencia import coalescedor_padrao
+from metricas import registro_padrao
+from parser_listas import FORMATO_LISTA, ErroFormatoResposta, extrair_itens
+from limite_taxa import ErroFilaCheia, estimar_tokens, limitador_padrao
+from resiliencia import ErroCircuitoAberto, ErroLLM, ErroTempoEsgotado, chamar_com_resiliencia, iterar_stream
+from roteamento import roteador_padrao
+
+
+def mensagens(prompt):
+    """Mensagens do chat para `prompt`: um par (sistema, usuário) ou só o texto do usuário."""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    sistema, usuario = prompt
+    return [{"role": "system", "content": sistema}, {"role": "user", "content": usuario}]
+
+
+def _limitada(agente, prompt, criar, esperas):
+    """Envolve `criar(timeout)` para que cada tentativa passe antes pelo limitador de taxa.
+
+    Os segundos de cada tentativa na fila do limitador vão para a lista
+    `esperas`, para descontá-los da latência que o roteador observa.
+    """
+    rota = roteador_padrao().rota(agente)
+    # O provedor conta a entrada mais o máximo de saída pedido
+    tokens = sum(estimar_tokens(m["content"]) for m in mensagens(prompt)) + rota["max_tokens"]
+
+    def chamada(timeout):
+        esperas.append(limitador_padrao().adquirir(tokens, rota.get("prioridade", 0)))
+        return criar(timeout)
+    return chamada
+
+
+def call_gpt(prompt, agente, usar_cache=True, formato=None):
+    """Chama o modelo da rota do agente e devolve o texto da resposta.
+
+    `prompt` é o texto ou o par (sistema, usuário) montado pelos prompt_*.
+    `formato` é repassado como `response_format` (saída estruturada). Se o
+    modelo principal estourar o orçamento de latência ou falhar, a chamada
+    passa para o modelo reserva (ver roteamento.Roteador). Em caso de falha
+    levanta ErroLLM (nunca devolve a mensagem de erro como texto).
+    """
+    metricas = registro_padrao()
+    modelo_rota = roteador_padrao().rota(agente)["modelo"]
+    inicio = time.monotonic()
+    # Prompts idênticos (mesma área, ideia, tema...) são respondidos pelo cache em disco
+    if usar_cache:
+        resposta = cache_padrao().obter(modelo_rota, prompt)
+        if resposta is not None:
+            metricas.registrar_chamada(agente, modelo_rota, time.monotonic() - inicio, cache_local=True)
+            return resposta
+    # E os que chegam ao mesmo tempo esperam pela mesma requisição, em vez de repeti-la
+    chave = (modelo_rota, prompt, repr(formato), usar_cache)
+    resposta, compartilhada = coalescedor_padrao().executar(
+        chave, lambda: _chamar_modelo(prompt, agente, formato, inicio))
+    if compartilhada:
+        metricas.registrar_chamada(agente, modelo_rota, time.monotonic() - inicio, cache_local=True)
+    return resposta
+
+
+def _chamar_modelo(prompt, agente, formato, inicio):
+    metricas = registro_padrao()
+    roteador = roteador_padrao()
+    extras = roteador.parametros(agente)
+    if formato:
+        extras["response_format"] = formato
+    plano = roteador.plano(agente)
+    for indice, (modelo, timeout, tentativas, tempo_e_falha) in enumerate(plano):
+        inicio_modelo = time.monotonic()
+        # Só o tempo no provedor conta para o roteador, não a fila do limitador
+        esperas = []
+        try:
+            response = chamar_com_resiliencia(
+                _limitada(agente, prompt, lambda timeout: obter_cliente().chat.completions.create(
+                    model=modelo, 
+                    messages=mensagens(prompt),
+                    # Agrupa as chamadas do mesmo agente no cache de prompts do provedor
+                    prompt_cache_key=f"agente-{agente}",
+                    timeout=timeout,
+                    **extras
+                ), esperas),
+                timeout,
+                tentativas=tentativas,
+                tempo_e_falha=tempo_e_falha
+            )
+        except ErroLLM as e:
+            duracao = time.monotonic() - inicio_modelo
+            metricas.registrar_chamada(agente, modelo, duracao, erro=type(e).__name__)
+            if isinstance(e, ErroTempoEsgotado):
+                roteador.registrar(agente, modelo, duracao - sum(esperas))
+            # Circuito aberto ou fila cheia valem para qualquer modelo: não adianta a reserva
+            if indice == len(plano) - 1 or isinstance(e, (ErroCircuitoAberto, ErroFilaCheia)):
+                raise
+            continue
+        break
+    duracao = time.monotonic() - inicio
+    roteador.registrar(agente, modelo, time.monotonic() - inicio_modelo - sum(esperas))
+    # Sem streaming, o primeiro token só aparece para o estudante no fim da chamada
+    metricas.registrar_chamada(agente, modelo, duracao, ttft=duracao, uso=response.usage)
+    resposta = response.choices[0].message.content
+    # A resposta da reserva vale só para esta chamada: guardada com a chave do
+    # principal, seria servida como dele até o fim do TTL
+    if modelo == roteador.rota(agente)["modelo"]:
+        cache_padrao().guardar(modelo, prompt, resposta)
+    return resposta
+
+
+def call_gpt_stream(prompt, agente, usar_cache=True):
+    """Versão em streaming de call_gpt: devolve os trechos do texto à medida que chegam.
+
+    Aqui o orçamento vale até o primeiro trecho; depois que o texto começou a
+    aparecer, uma falha não passa para a reserva (o estudante veria a resposta
+    recomeçar). Sessões que pedem o mesmo texto enquanto ele é gerado leem a
+    mesma transmissão, a partir do início.
+    """
+    metricas = registro_padrao()
+    modelo_rota = roteador_padrao().rota(agente)["modelo"]
+    inicio = time.monotonic()
+    if usar_cache:
+        resposta = cache_padrao().obter(modelo_rota, prompt)
+        if resposta is not None:
+            metricas.registrar_chamada(agente, modelo_rota, time.monotonic() - inicio, cache_local=True)
+            yield resposta
+            return
+    transmissao, compartilhada = coalescedor_padrao().transmitir(
+        (modelo_rota, prompt, "stream", usar_cache), lambda: _transmitir_modelo(prompt, agente, inicio))
+    ttft = None
+    for trecho in transmissao.ler():
+        if ttft is None:
+            ttft = time.monotonic() - inicio
+        yield trecho
+    if compartilhada:
+        metricas.registrar_chamada(agente, modelo_rota, time.monotonic() - inicio, ttft=ttft, cache_local=True)
+
+
+def _transmitir_modelo(prompt, agente, inicio):
+    metricas = registro_padrao()
+    roteador = roteador_padrao()
+    extras = roteador.parametros(agente)
+    plano = roteador.plano(agente)
+    trechos = []
+    for indice, (modelo, timeout, tentativas, tempo_e_falha) in enumerate(plano):
+        inicio_modelo = time.monotonic()
+        # Só o tempo no provedor conta para o roteador, não a fila do limitador
+        esperas = []
+        ttft = uso = None
+        try:
+            stream = chamar_com_resiliencia(
+                _limitada(agente, prompt, lambda timeout: obter_cliente().chat.completions.create(
+                    model=modelo,
+                    messages=mensagens(prompt),
+                    prompt_cache_key=f"agente-{agente}",
+                    stream=True,
+                    # O último pedaço do stream traz o consumo de tokens
+                    stream_options={"include_usage": True},
+                    timeout=timeout,
+                    **extras
+                ), esperas),
+                timeout,
+                tentativas=tentativas,
+                tempo_e_falha=tempo_e_falha
+            )
+            for chunk in iterar_stream(stream, tempo_e_falha=tempo_e_falha):
+                if chunk.usage:
+                    uso = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.monotonic() - inicio
+                        roteador.registrar(agente, modelo, time.monotonic() - inicio_modelo - sum(esperas))
+                    trechos.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except ErroLLM as e:
+            duracao = time.monotonic() - inicio_modelo
+            metricas.registrar_chamada(agente, modelo, duracao, ttft=ttft, erro=type(e).__name__)
+            if isinstance(e, ErroTempoEsgotado) and ttft is None:
+                roteador.registrar(agente, modelo, duracao - sum(esperas))
+            if trechos or indice == len(plano) - 1 or isinstance(e, (ErroCircuitoAberto, ErroFilaCheia)):
+                raise
+            continue
+        break
+    metricas.registrar_chamada(agente, modelo, time.monotonic() - inicio, ttft=ttft, uso=uso)
+    if modelo == roteador.rota(agente)["modelo"]:
+        cache_padrao().guardar(modelo, prompt, "".join(trechos))
+
+
+def gerar_lista(prompt, agente, usar_cache=True):
+    """Gera uma lista de {titulo, justificativa} usando saída estruturada (JSON).
+
+    Se a resposta vier malformada ou incompleta, pede uma nova resposta uma
+    única vez e aproveita o que for válido.
+    """
+    try:
+        return extrair_itens(call_gpt(prompt, agente, usar_cache, formato=FORMATO_LISTA))
+    except ErroFormatoResposta:
+        resposta = call_gpt(prompt, agente, usar_cache=False, formato=FORMATO_LISTA)
+        return extrair_itens(resposta, minimo=1)
+
+
+def em_segundo_plano(executor, funcao, *args):
+    """Envia `funcao` ao executor levando junto o contexto (sessão das métricas)."""
+    return executor.submit(contextvars.copy_context().run, funcao, *args)
+
+
+# Cada prompt é um par (sistema, usuário): as instruções fixas do agente vão
+# na mensagem de sistema, idêntica em todas as chamadas, e só as variáveis do
+# estudante vão na mensagem do usuário. Assim o prefixo longo é reaproveitado
+# pelo cache de prompts do provedor (tokens em cache custam e demoram menos).
+
+SISTEMA_TEMAS = """Você é um especialista em metodologia de pesquisa científica com ampla experiência
+        em orientação de trabalhos de conclusão de curso.
+
+        Sua tarefa é sugerir temas viáveis para uma monografia no formato de revisão 
+        integrativa da literatura, na área de conhecimento e a partir da ideia ou 
+        interesse inicial informados pelo estudante.
+
+        Critérios para os temas sugeridos:
+        - Devem ser adequados ao escopo de uma revisão integrativa (ou seja, precisam 
+        ter literatura científica suficiente para ser revisada)
+        - Devem ser específicos o bastante para um TCC de graduação, sem serem amplos 
+        demais nem restritos demais
+        - Devem estar alinhados com o interesse inicial do estudante, explorando 
+        variações, recortes e abordagens diferentes
+        - Devem ser formulados como títulos acadêmicos, de forma clara e objetiva
+
+        Gere exatamente 10 sugestões de temas no campo "itens". Em cada item, "titulo" deve 
+        conter apenas o título, sem numeração, e "justificativa" uma frase curta sobre o recorte."""
+
+
+def prompt_temas(area, ideia_bruta, exclusao="", perspectiva=""):
+    """Prompt do Agente 1 (temas a partir da área e da ideia inicial)."""
+    contexto_exclusao = (f"\nNÃO repita nem reformule estes temas já sugeridos (resumidos por palavras-chave):\n{exclusao}"
+                         if exclusao else "")
+    contexto_perspectiva = f"\nNesta lista, priorize {perspectiva}." if perspectiva else ""
+    return SISTEMA_TEMAS, f"""Contexto fornecido pelo estudante:
+        - Área de conhecimento: {area}
+        - Ideia ou interesse inicial: {ideia_bruta}
+        {contexto_exclusao}{contexto_perspectiva}"""
+
+
+# Perspectivas do pool de temas: uma chamada por perspectiva, em paralelo
+PERSPECTIVAS_TEMAS = [
+    "recortes conceituais e teóricos",
+    "recortes populacionais e contextuais",
+    "recortes aplicados, de intervenção e de práticas profissionais",
+]
+
+SISTEMA_SUBTEMAS = """Você é um especialista em metodologia de pesquisa científica com ampla experiência 
+        em revisões integrativas da literatura.
+
+        Sua tarefa é mapear os principais subtemas que compõem ou se relacionam diretamente 
+        com o tema central de pesquisa informado, considerando a área de conhecimento do estudante.
+
+        Entende-se por subtema um recorte temático específico que pode ser investigado 
+        de forma independente dentro do tema central, com literatura científica própria 
+        e relevância para uma revisão integrativa de TCC de graduação.
+
+        Critérios para as sugestões:
+        - Devem ser recortes diretos do tema central, não tópicos periféricos ou tangenciais
+        - Devem ter literatura científica disponível suficiente para uma revisão integrativa
+        - Devem variar entre recortes conceituais, populacionais, contextuais e aplicados,
+        sempre que pertinente ao tema
+        - Devem ser viáveis no escopo de um TCC de graduação
+            
+        Output:
+        Gere exatamente 10 sugestões de subtemas no campo "itens".
+        Em cada item, "titulo" deve conter apenas o título do subtema e "justificativa" uma breve
+        justificativa acadêmica de sua relevância para o tema central.
+        Use linguagem acadêmica formal."""
+
+
+def prompt_subtemas(area, tema_base):
+    """Prompt do Agente 2 (subtemas do tema base)."""
+    return SISTEMA_SUBTEMAS, f"""Área de conhecimento: {area}
+        Tema central: {tema_base}"""
+
+
+SISTEMA_PROBLEMAS = """Você é um especialista em metodologia de pesquisa científica com ampla experiência
+        em revisões integrativas da literatura.
+
+        Sua tarefa é formular problemas de pesquisa adequados para uma monografia no 
+        formato de revisão integrativa da literatura, a partir do tema escolhido pelo estudante.
+
+        Entende-se por problema de pesquisa uma pergunta clara, delimitada e investigável 
+        que orienta toda a revisão, cuja resposta pode ser construída a partir da análise 
+        crítica da literatura científica existente — sem coleta de dados primários.
+
+        Critérios para as sugestões:
+        - Devem ser perguntas respondíveis por meio de revisão da literatura, 
+        não por experimentos ou coleta de dados primários
+        - Devem ter escopo adequado a um TCC de graduação: nem amplos demais 
+        (impossíveis de responder) nem restritos demais (literatura insuficiente)
+        - Devem variar em abordagem: algumas focando em relações entre variáveis, 
+        outras em lacunas do conhecimento, outras em comparações ou tendências 
+        identificadas na literatura
+        - Devem ser formulados de forma clara, objetiva e em linguagem acadêmica formal
+
+        Gere exatamente 10 sugestões de problema de pesquisa no campo "itens".
+        Em cada item, "titulo" deve conter apenas a pergunta, sem numeração, e "justificativa"
+        uma frase curta sobre a abordagem da pergunta."""
+
+
+def prompt_problemas(tema_escolhido):
+    """Prompt do Agente 3 (problemas de pesquisa)."""
+    return SISTEMA_PROBLEMAS, f"Tema escolhido: {tema_escolhido}"
+
+
+SISTEMA_OBJETIVOS = """Você é um especialista em metodologia de pesquisa científica com ampla experiência
+        em revisões integrativas da literatura.
+
+        Sua tarefa é sugerir objetivos específicos adequados para uma monografia no 
+        formato de revisão integrativa da literatura, com base no tema e no problema 
+        de pesquisa informados pelo estudante.
+
+        Entende-se por objetivo específico um desdobramento operacional do objetivo geral, 
+        que descreve uma etapa concreta e alcançável da pesquisa. Em uma revisão integrativa, 
+        os objetivos específicos tipicamente envolvem ações como identificar, descrever, 
+        analisar, comparar, sintetizar ou discutir aspectos da literatura sobre o tema.
+
+        Critérios para as sugestões:
+        - Devem ser diretamente derivados do problema de pesquisa apresentado
+        - Devem ser alcançáveis exclusivamente por meio da análise da literatura científica,
+        sem coleta de dados primários
+        - Devem ser redigidos com verbo no infinitivo no início da frase, 
+        conforme norma acadêmica (ex: Identificar, Analisar, Comparar, Sintetizar)
+        - Devem ser complementares entre si, cobrindo diferentes dimensões do problema,
+        sem sobreposição ou redundância
+        - Devem ter escopo adequado a um TCC de graduação
+
+        Gere exatamente 10 sugestões no campo "itens". Cada item deve conter:
+        - "titulo": o objetivo específico redigido em uma frase iniciada por verbo no infinitivo
+        - "justificativa": uma explicação em até dois parágrafos justificando sua relevância e como 
+        ele contribui para responder ao problema de pesquisa"""
+
+
+def prompt_objetivos(tema_escolhido, problema_pesquisa):
+    """Prompt do Agente 4 (objetivos específicos)."""
+    return SISTEMA_OBJETIVOS, f"""Tema: {tema_escolhido}
+        Problema de pesquisa: {problema_pesquisa}"""
+
+
+SISTEMA_REFERENCIAL = """Você é um especialista em metodologia de pesquisa científica e revisão de literatura,
+        com conhecimento aprofundado sobre o campo de conhecimento informado pelo estudante.
+
+        Sua tarefa é mapear o panorama intelectual da literatura sobre o tema informado,
+        auxiliando um estudante de graduação a compreender as bases teóricas antes de 
+        iniciar sua revisão integrativa.
+
+        Sua resposta deve ser organizada em duas partes:
+
+        PARTE 1 — MAPA DA LITERATURA
+
+        Apresente uma tabela em formato Markdown com as seguintes colunas:
+        Autor | Obra ou Linha de Pesquisa | Período de Influência | Contribuição para o Tema
+
+        Inclua entre 8 e 12 entradas, distribuídas entre:
+        - Autores e obras seminais que estabeleceram os fundamentos do tema
+        - Autores contemporâneos de referência que consolidaram ou expandiram o campo
+
+        ATENÇÃO: Inclua apenas autores e obras dos quais você tenha alta certeza de 
+        existência e conteúdo. Se não tiver certeza sobre um título exato, descreva 
+        a linha de pesquisa do autor em vez de arriscar um título incorreto.
+
+        PARTE 2 — CORRENTES DE PENSAMENTO
+
+        Em linguagem acadêmica formal, descreva em 2 a 3 parágrafos as principais 
+        correntes teóricas ou perspectivas identificadas na literatura sobre o tema, 
+        destacando convergências, divergências e eventuais lacunas que justificam 
+        novas revisões sobre o assunto."""
+
+
+def prompt_referencial(area, tema_escolhido):
+    """Prompt do Agente 5 (referencial teórico)."""
+    return SISTEMA_REFERENCIAL, f"""Campo de conhecimento: {area}
+        Tema: {tema_escolhido}"""
+
+
+SISTEMA_ESTRATEGIA = """Você é um especialista em Biblioteconomia, Ciência da Informação e recuperação 
+        de informação em bases de dados científicas, com amplo conhecimento sobre os 
+        vocabulários controlados DeCS (Descritores em Ciências da Saúde) e MeSH 
+        (Medical Subject Headings).
+
+        Sua tarefa é construir uma estratégia de busca estruturada para uma revisão 
+        integrativa da literatura sobre o tema, o período e os idiomas informados.
+
+        INSTRUÇÃO CRÍTICA SOBRE DESCRITORES:
+        Inclua APENAS descritores dos quais você tenha alta certeza de que são termos 
+        controlados válidos no DeCS ou MeSH. Se não tiver certeza sobre um descritor 
+        específico, substitua-o por um termo livre relevante e sinalize claramente 
+        que se trata de termo livre (não controlado). Nunca apresente um termo livre 
+        como se fosse descritor controlado.
+
+        Organize sua resposta nas seguintes seções:
+
+        SEÇÃO 1 — DESCRITORES IDENTIFICADOS
+
+        Apresente uma tabela Markdown com as colunas:
+        Descritor (PT) | Descritor (EN) | Fonte (DeCS / MeSH / Termo Livre) | Observação
+
+        SEÇÃO 2 — STRINGS DE BUSCA
+
+        Para cada base abaixo, apresente a string em bloco de código, 
+        construída com operadores booleanos (AND, OR, NOT) e, quando aplicável, 
+        com uso de aspas para expressões exatas e truncamento (*):
+        ```pubmed
+        [string para PubMed]
+        ```
+        ```scielo
+        [string para SciELO]
+        ```
+        ```lilacs
+        [string para Lilacs]
+        ```
+        ```google_academico
+        [string para Google Acadêmico]
+        ```
+
+        SEÇÃO 3 — FILTROS RECOMENDADOS
+
+        Descreva os filtros a serem aplicados em cada base para restringir os 
+        resultados ao período e aos idiomas definidos, considerando as 
+        particularidades de cada plataforma.
+
+        SEÇÃO 4 — ORIENTAÇÕES DE USO
+
+        Em até um parágrafo por base, oriente o estudante sobre como aplicar 
+        a string e os filtros na interface de cada plataforma, e recomende que 
+        todos os descritores sejam verificados diretamente no portal DeCS 
+        (decs.bvsalud.org) e no MeSH (meshb.nlm.nih.gov) antes do uso."""
+
+
+def prompt_estrategia(tema_escolhido, ano_atual=None):
+    """Prompt do Agente 6 (estratégia de busca), para os últimos cinco anos."""
+    ano_atual = ano_atual or datetime.now().year
+    ano_inicial = ano_atual - 5
+    return SISTEMA_ESTRATEGIA, f"""Tema: {tema_escolhido}
+        Período: {ano_inicial} a {ano_atual}
+        Idiomas: Português, Inglês e Espanhol"""
@@ -0,0 +1,78 @@
+import json
+import time
+
+from openai import OpenAIError
+from openai.types.chat import ChatCompletion
+
+from agentes import mensagens
+from cliente_openai import obter_cliente
+from resiliencia import ErroLLM
+
+ENDPOINT = "/v1/chat/completions"
+STATUS_FINAIS = {"completed", "failed", "expired", "cancelled"}
+
+
+class ErroLote(ErroLLM):
+    mensagem = "O processamento em lote não foi concluído."
+
+
+def montar_jsonl(pedidos, modelo, parametros=None):
+    """Uma linha da Batch API por pedido ({custom_id: (prompt, formato)}); prompt como em call_gpt.
+
+    `parametros` (max_completion_tokens, reasoning_effort...) vão em todos os pedidos.
+    """
+    linhas = []
+    for custom_id, (prompt, formato) in pedidos.items():
+        corpo = {"model": modelo, "messages": mensagens(prompt), **(parametros or {})}
+        if formato:
+            corpo["response_format"] = formato
+        linhas.append(json.dumps({"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": corpo},
+                                 ensure_ascii=False))
+    return ("\n".join(linhas) + "\n").encode("utf-8")
+
+
+def _ler_jsonl(cliente, id_arquivo):
+    if not id_arquivo:
+        return []
+    texto = cliente.files.content(id_arquivo).text
+    return [json.loads(linha) for linha in texto.splitlines() if linha.strip()]
+
+
+def executar_lote(pedidos, modelo, intervalo=30, prazo=None, aviso=None, parametros=None):
+    """Envia `pedidos` ({custom_id: (prompt, formato)}) como um job da Batch API e espera o fim.
+
+    Consulta o status a cada `intervalo` segundos (até `prazo` segundos, se
+    dado) e devolve {custom_id: ChatCompletion ou ErroLote}; pedidos que o
+    lote não chegou a processar (expirado ou cancelado) voltam como ErroLote.
+    `aviso(lote)` é chamado a cada consulta, para acompanhar o progresso.
+    """
+    cliente = obter_cliente()
+    try:
+        arquivo = cliente.files.create(file=("lote.jsonl", montar_jsonl(pedidos, modelo, parametros)), purpose="batch")
+        lote = cliente.batches.create(input_file_id=arquivo.id, endpoint=ENDPOINT, completion_window="24h")
+        limite = time.monotonic() + prazo if prazo else None
+        while lote.status not in STATUS_FINAIS:
+            if limite and time.monotonic() > limite:
+                raise ErroLote(f"lote {lote.id} ainda em '{lote.status}' ao fim do prazo")
+            time.sleep(intervalo)
+            lote = cliente.batches.retrieve(lote.id)
+            if aviso:
+                aviso(lote)
+        if lote.status == "failed":
+            erros = "; ".join(e.message or "" for e in (lote.errors.data if lote.errors else []) or [])
+            raise ErroLote(f"lote {lote.id} falhou: {erros}")
+        linhas = _ler_jsonl(cliente, lote.output_file_id) + _ler_jsonl(cliente, lote.error_file_id)
+    except OpenAIError as e:
+        raise ErroLote(str(e)) from e
+
+    resultados = {}
+    for linha in linhas:
+        resposta = linha.get("response") or {}
+        if resposta.get("status_code") == 200:
+            resultados[linha["custom_id"]] = ChatCompletion.model_validate(resposta["body"])
+        else:
+            detalhe = linha.get("error") or resposta.get("body", {}).get("error") or {}
+            resultados[linha["custom_id"]] = ErroLote(detalhe.get("message", f"status {resposta.get('status_code')}"))
+    for custom_id in pedidos:
+        resultados.setdefault(custom_id, ErroLote(f"pedido não processado (lote {lote.status})"))
+    return resultados
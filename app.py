@@ -1,14 +1,34 @@
 import streamlit as st
-from openai import OpenAI
+from cliente_openai import preparar_em_segundo_plano
 import os
 from dotenv import load_dotenv
 #from fpdf import FPDF
 from io import BytesIO
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+from resiliencia import ErroLLM
+from agentes import (call_gpt_stream, em_segundo_plano, gerar_lista, prompt_estrategia, prompt_objetivos,
+                     prompt_problemas, prompt_referencial, prompt_subtemas, prompt_temas, PERSPECTIVAS_TEMAS)
+from exportacao import assinatura_plano, criar_pdf, gerar_conteudo_markdown
+from similaridade import LIMIAR_PADRAO, filtrar_quase_duplicatas, resumo_exclusao
+from metricas import registro_padrao, sessao_atual
+from painel_metricas import exibir_painel
+from sessoes import armazem_padrao
+from limite_taxa import limitador_padrao
+from grafo_plano import GRAFO_PLANO
+import functools
+import hashlib
+import json
+import uuid
 
 # 1. Configurações Iniciais
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+@st.cache_resource(show_spinner=False)
+def carregar_ambiente():
+    # Uma vez por processo: as configurações só são lidas na criação dos singletons
+    load_dotenv()
+
+carregar_ambiente()
 
 st.set_page_config(page_title="Agente Monografias", layout="wide")
 st.title("🎓 Sistema de IA para escolha do tema e estratégia de pesquisa para Monografia. v1.1")
@@ -16,20 +36,429 @@ st.markdown("#### Sistema criado por Flávio Seabra (https://www.instagram.com/f
 
 #st.title("")
 
+# Painel de métricas, escondido: acessível só por ?admin=<ADMIN_TOKEN>
+if os.getenv("ADMIN_TOKEN") and st.query_params.get("admin") == os.getenv("ADMIN_TOKEN"):
+    exibir_painel()
+    st.stop()
+
+# Progresso salvo a cada passo, para sobreviver a recarregamentos e quedas de conexão
+CHAVES_PERSISTIDAS = ("step", "dados", "grafo_plano", "campo_area", "campo_ideia", "lista_temas_sugeridos",
+                      "pool_temas")
+# Listas que ficavam fora de `dados` nos planos salvos antes do grafo de dependências
+CHAVES_ANTIGAS = ("subtemas_lista", "probs_lista", "lista_objs")
+
+def retomar_sessao(id_sessao):
+    """Restaura o progresso salvo do plano `id_sessao`; devolve False se não existir."""
+    estado = armazem_padrao().carregar(id_sessao)
+    if estado is None:
+        return False
+    for chave in CHAVES_ANTIGAS:
+        if chave in estado:
+            estado["dados"].setdefault(chave, estado.pop(chave))
+    st.session_state.update(estado)
+    st.session_state.id_sessao = id_sessao
+    st.session_state.prefetch = {}
+    st.session_state.recarga_temas = None
+    return True
+
+def salvar_progresso():
+    """Grava o progresso da sessão no armazém, só quando algo mudou desde a última gravação."""
+    estado = {k: st.session_state[k] for k in CHAVES_PERSISTIDAS if k in st.session_state}
+    if estado.get("step") == 1 and not estado.get("lista_temas_sugeridos"):
+        # Nada gerado ainda: não vale a pena guardar (evita uma linha por visita)
+        return
+    assinatura = hashlib.sha256(json.dumps(estado, sort_keys=True).encode("utf-8")).hexdigest()
+    if st.session_state.get("assinatura_salva") != assinatura:
+        armazem_padrao().salvar(st.session_state.id_sessao, estado)
+        st.session_state.assinatura_salva = assinatura
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def exportar_plano(assinatura, formato, _dados, gerado_em=None):
+    """Plano exportado em `formato` ("md" ou "pdf"), memorizado pela assinatura do conteúdo.
+
+    Reruns do passo 6 (inclusive o clique no download) reaproveitam o documento;
+    `_dados` não entra na chave do cache, só a assinatura. A data de geração do
+    Markdown (`gerado_em`, em minutos) entra na chave, para não sair a data da
+    primeira exportação desse conteúdo.
+    """
+    if formato == "pdf":
+        return criar_pdf(_dados)
+    return gerar_conteudo_markdown(_dados, gerado_em)
+
+if "step" not in st.session_state:
+    # Sessão nova no navegador: retoma o plano do link (?sessao=...), se houver
+    id_link = st.query_params.get("sessao")
+    if id_link and not retomar_sessao(id_link):
+        st.warning("Não encontramos o plano deste link (ele pode ter expirado). Começando um novo plano.")
 if "step" not in st.session_state:
     st.session_state.step = 1
 if "dados" not in st.session_state:
     st.session_state.dados = {}
+if "prefetch" not in st.session_state:
+    st.session_state.prefetch = {}
+if "grafo_plano" not in st.session_state:
+    st.session_state.grafo_plano = {}
+# Identifica o plano nas métricas (um novo id a cada "Reiniciar Sistema")
+if "id_sessao" not in st.session_state:
+    st.session_state.id_sessao = uuid.uuid4().hex
+sessao_atual.set(st.session_state.id_sessao)
+# O endereço da página leva o id do plano: recarregar ou reabrir o link retoma o progresso
+if st.query_params.get("sessao") != st.session_state.id_sessao:
+    st.query_params["sessao"] = st.session_state.id_sessao
+salvar_progresso()
+st.caption(f"Código do seu plano: `{st.session_state.id_sessao}`. Guarde-o (ou o endereço desta página) "
+           "para continuar de onde parou.")
+
+def parar_com_erro(erro):
+    """Mostra a falha do modelo e interrompe o passo sem salvar nada na sessão."""
+    st.error(erro.mensagem)
+    st.button("Tentar novamente")
+    st.stop()
+
+# Passo em que cada escolha é feita (ou, nos Agentes 5 e 6, gerada), na ordem da cadeia
+PASSOS_DO_PLANO = (("tema_base", 1), ("tema_escolhido", 2), ("problema_pesquisa", 3), ("objetivos", 4),
+                   ("ref_classicas", 5), ("ref_atuais", 5))
+
+def proximo_passo():
+    """Primeiro passo com algo por escolher ou gerar (6 se o plano está completo)."""
+    return next((passo for chave, passo in PASSOS_DO_PLANO if chave not in st.session_state.dados), 6)
+
+def escolher(**valores):
+    """Grava as escolhas do estudante e segue para o próximo passo pendente.
+
+    Só o que dependia das escolhas anteriores sai do plano (ver grafo_plano):
+    rever o problema, por exemplo, refaz os objetivos e mantém o resto.
+    """
+    GRAFO_PLANO.alterar(st.session_state.dados, st.session_state.grafo_plano, **valores)
+    st.session_state.step = proximo_passo()
+    st.rerun()
+
+def gerar_no(nome, gerar):
+    """Gera o nó `nome` do plano, reaproveitando o valor já gerado antes para as mesmas entradas."""
+    dados = st.session_state.dados
+    valor = GRAFO_PLANO.memorizado(dados, st.session_state.grafo_plano, nome)
+    if valor is None:
+        valor = gerar()
+    GRAFO_PLANO.registrar(dados, st.session_state.grafo_plano, nome, valor)
+
+# Prazo total (em segundos) para os Agentes 5 e 6, que rodam em paralelo
+PRAZO_AGENTES_5_6 = float(os.getenv("PRAZO_AGENTES_5_6", "300"))
+# Intervalo (em segundos) entre atualizações do texto parcial em streaming
+INTERVALO_ATUALIZACAO = 0.3
+
+def executar_agentes_em_paralelo(tarefas, prazo):
+    """Executa os prompts de `tarefas` ({chave: (rótulo, agente, prompt)}) em paralelo.
+
+    O texto de cada agente é exibido em tempo real (streaming) dentro do seu
+    indicador de progresso. Devolve {chave: resposta} apenas para os agentes
+    que terminaram com sucesso dentro do prazo total.
+    """
+    if not tarefas:
+        return {}
+    parciais = {chave: [] for chave in tarefas}
+
+    def consumir(chave, agente, prompt):
+        for trecho in call_gpt_stream(prompt, agente):
+            parciais[chave].append(trecho)
+        return "".join(parciais[chave])
+
+    executor = ThreadPoolExecutor(max_workers=len(tarefas))
+    futuros = {}
+    status = {}
+    previas = {}
+    for chave, (rotulo, agente, prompt) in tarefas.items():
+        futuros[em_segundo_plano(executor, consumir, chave, agente, prompt)] = chave
+        status[chave] = st.status(f"{rotulo}: em andamento...", state="running", expanded=True)
+        with status[chave]:
+            previas[chave] = st.empty()
+
+    resultados = {}
+    limite = time.monotonic() + prazo
+    pendentes = set(futuros)
+    while pendentes:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            break
+        # Acorda periodicamente para atualizar o texto parcial na tela
+        concluidos, pendentes = wait(pendentes, timeout=min(restante, INTERVALO_ATUALIZACAO),
+                                     return_when=FIRST_COMPLETED)
+        for futuro in concluidos:
+            chave = futuros[futuro]
+            try:
+                resultados[chave] = futuro.result()
+            except ErroLLM as e:
+                previas[chave].empty()
+                status[chave].update(label=f"{tarefas[chave][0]}: {e.mensagem}", state="error")
+                continue
+            previas[chave].markdown(resultados[chave])
+            status[chave].update(label=f"{tarefas[chave][0]}: concluído", state="complete")
+        posicao = limitador_padrao().posicao(st.session_state.id_sessao)
+        for futuro in pendentes:
+            chave = futuros[futuro]
+            if posicao and not parciais[chave]:
+                previas[chave].markdown(f"⏳ Aguardando na fila: você é o {posicao}º.")
+            else:
+                previas[chave].markdown("".join(parciais[chave]) + " ▌")
+
+    for futuro in pendentes:
+        chave = futuros[futuro]
+        status[chave].update(label=f"{tarefas[chave][0]}: tempo limite excedido", state="error")
+    # Não bloqueia a sessão esperando threads que estouraram o prazo
+    executor.shutdown(wait=False, cancel_futures=True)
+    return resultados
+
+@st.cache_resource
+def executor_prefetch():
+    # Um único pool por processo, compartilhado por todas as sessões, só para o trabalho
+    # especulativo (busca antecipada e recarga dos temas): quem espera na tela não entra nele
+    return ThreadPoolExecutor(max_workers=int(os.getenv("PREFETCH_WORKERS", "8")))
+
+def iniciar_prefetch(destino, agente, prompt):
+    """Começa a gerar em segundo plano o próximo passo para a opção marcada."""
+    atual = st.session_state.prefetch.get(destino)
+    if atual and atual[0] == prompt:
+        return
+    # Uma escolha diferente substitui (e descarta) a geração antecipada anterior
+    st.session_state.prefetch[destino] = (prompt, em_segundo_plano(executor_prefetch(), gerar_lista, prompt, agente))
+
+def adiantar_no(nome, agente, prompt, **escolhas):
+    """iniciar_prefetch do nó `nome` para as escolhas marcadas, se o grafo ainda não o tem para elas."""
+    previsto = {**st.session_state.dados, **escolhas}
+    if not GRAFO_PLANO.disponivel(previsto, st.session_state.grafo_plano, nome):
+        iniciar_prefetch(nome, agente, prompt)
+
+def aguardar_na_fila(futuros):
+    """Espera os futuros mostrando ao estudante sua posição na fila do limitador de taxa."""
+    aviso = st.empty()
+    exibida = None
+    pendentes = set(futuros)
+    while pendentes:
+        _, pendentes = wait(pendentes, timeout=INTERVALO_ATUALIZACAO)
+        posicao = limitador_padrao().posicao(st.session_state.id_sessao) if pendentes else None
+        if posicao == exibida:
+            continue
+        exibida = posicao
+        if posicao:
+            aviso.info(f"⏳ Muitos colegas usando o sistema agora: você é o {posicao}º da fila. "
+                       "Sua vez chega em instantes, não é preciso recarregar a página.")
+        else:
+            aviso.empty()
+
+def em_primeiro_plano(funcao, *args):
+    """Executa `funcao` numa thread própria, mostrando a fila enquanto espera."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        futuro = em_segundo_plano(executor, funcao, *args)
+        aguardar_na_fila([futuro])
+        return futuro.result()
+
+def gerar_lista_antecipada(destino, agente, prompt):
+    """Usa o resultado antecipado se a escolha não mudou; senão chama o modelo."""
+    antecipado = st.session_state.prefetch.pop(destino, None)
+    if antecipado and antecipado[0] == prompt:
+        aguardar_na_fila([antecipado[1]])
+        try:
+            return antecipado[1].result()
+        except ErroLLM:
+            # A geração antecipada falhou: tenta de novo agora, em primeiro plano
+            pass
+    return em_primeiro_plano(gerar_lista, prompt, agente)
+
+# As sugestões de temas vêm de um "pool" maior, gerado de uma vez (uma chamada
+# por perspectiva, em paralelo) e servido em páginas, sem nova chamada à API
+TAMANHO_PAGINA_TEMAS = 10
+
+# Similaridade (Jaccard de trigramas) a partir da qual dois temas contam como repetidos
+LIMIAR_DUPLICATA = float(os.getenv("LIMIAR_DUPLICATA_TEMAS", LIMIAR_PADRAO))
+
+def deduplicar_temas(novos, ja_vistos=()):
+    """Remove de `novos` os temas iguais ou quase iguais entre si ou aos já vistos."""
+    return filtrar_quase_duplicatas(novos, ja_vistos, limiar=LIMIAR_DUPLICATA)
+
+def encomendar_temas(area, ideia_bruta, ja_vistos=(), usar_cache=True, antecipada=False):
+    """Dispara uma chamada por perspectiva, em paralelo, e devolve os futuros.
+
+    Com `antecipada` (recarga do pool) as chamadas vão para o executor_prefetch;
+    senão o estudante está esperando e elas ganham threads próprias, para não
+    ficarem atrás da busca antecipada da turma inteira.
+    """
+    # Resumo compacto em vez da lista inteira: o prompt não cresce a cada página
+    exclusao = resumo_exclusao(ja_vistos)
+    executor = executor_prefetch() if antecipada else ThreadPoolExecutor(max_workers=len(PERSPECTIVAS_TEMAS))
+    futuros = [em_segundo_plano(executor, gerar_lista,
+                                prompt_temas(area, ideia_bruta, exclusao, perspectiva), "temas", usar_cache)
+               for perspectiva in PERSPECTIVAS_TEMAS]
+    if not antecipada:
+        # As chamadas já enviadas seguem até o fim; as threads saem quando terminarem
+        executor.shutdown(wait=False)
+    return futuros
+
+def coletar_temas(futuros):
+    """Junta os títulos das chamadas; só falha se nenhuma perspectiva tiver dado certo."""
+    aguardar_na_fila(futuros)
+    temas, erro = [], None
+    for futuro in futuros:
+        try:
+            temas.extend(item['titulo'] for item in futuro.result())
+        except ErroLLM as e:
+            erro = e
+    if not temas and erro:
+        raise erro
+    return temas
+
+def servir_pagina_temas(area, ideia_bruta):
+    """Move a próxima página do pool para a lista exibida, recarregando o pool quando necessário."""
+    exibidos = st.session_state.lista_temas_sugeridos
+    recarga = st.session_state.recarga_temas
+    # Usa a recarga em segundo plano se já terminou ou se o pool não tem uma página inteira
+    if recarga and (all(f.done() for f in recarga) or len(st.session_state.pool_temas) < TAMANHO_PAGINA_TEMAS):
+        st.session_state.recarga_temas = None
+        try:
+            novos = coletar_temas(recarga)
+        except ErroLLM:
+            novos = []
+        st.session_state.pool_temas += deduplicar_temas(novos, exibidos + st.session_state.pool_temas)
+    if not st.session_state.pool_temas:
+        # Sem nada no pool nem recarga pronta: busca agora, em primeiro plano
+        novos = coletar_temas(encomendar_temas(area, ideia_bruta, exibidos))
+        st.session_state.pool_temas = deduplicar_temas(novos, exibidos)
+
+    pagina = st.session_state.pool_temas[:TAMANHO_PAGINA_TEMAS]
+    st.session_state.pool_temas = st.session_state.pool_temas[TAMANHO_PAGINA_TEMAS:]
+    # CONCATENA: Adiciona os novos temas à lista existente
+    exibidos.extend(pagina)
+
+    # Restando só uma página no pool, já encomenda mais em segundo plano
+    if len(st.session_state.pool_temas) <= TAMANHO_PAGINA_TEMAS and not st.session_state.recarga_temas:
+        st.session_state.recarga_temas = encomendar_temas(area, ideia_bruta, exibidos + st.session_state.pool_temas,
+                                                          antecipada=True)
+
+def painel_isolado(funcao):
+    """st.fragment para os painéis de escolha de cada passo.
+
+    Marcar uma opção reexecuta só o painel, não o script inteiro; os botões
+    que mudam de passo chamam st.rerun(), que volta a executar o app todo. A
+    reexecução isolada roda numa thread nova, por isso a sessão das métricas
+    é marcada de novo.
+
+    O ajuste em texto livre e os botões de cada painel ficam num st.form: nada
+    vai ao servidor até o envio. A lista de opções fica fora do formulário de
+    propósito, porque cada marcação já adianta o passo seguinte (prefetch).
+    """
+    @st.fragment
+    @functools.wraps(funcao)
+    def executar(*args):
+        sessao_atual.set(st.session_state.id_sessao)
+        return funcao(*args)
+    return executar
+
+@painel_isolado
+def painel_escolha_tema(area, ideia_bruta):
+    tema_selecionado = st.radio(
+        "Selecione o tema que deseja utilizar:",
+        st.session_state.lista_temas_sugeridos,
+        index=None,
+        help="Esta lista contém todas as sugestões geradas nesta sessão."
+    )
+
+    # Enquanto o estudante decide, já adianta os subtemas da opção marcada
+    if tema_selecionado:
+        adiantar_no('subtemas_lista', 'subtemas', prompt_subtemas(area, tema_selecionado),
+                    area_usuario=area, tema_base=tema_selecionado)
+
+    with st.form("form_tema", border=False):
+        outra_opcao = st.text_input("Ou ajuste o tema selecionado (ou digite um novo) aqui:")
+        avancar = st.form_submit_button("Avançar para Aprofundamento")
+    if avancar:
+        escolha_final = outra_opcao if outra_opcao.strip() else tema_selecionado
+        if escolha_final:
+            escolher(area_usuario=area, ideia_usuario=ideia_bruta, tema_base=escolha_final)
+
+@painel_isolado
+def painel_escolha_subtema():
+    # Interface de Seleção por Clique
+    sub_selecionado = st.radio(
+        "Selecione um recorte específico para sua pesquisa:",
+        [item['titulo'] for item in st.session_state.dados['subtemas_lista']],
+        captions=[item['justificativa'] for item in st.session_state.dados['subtemas_lista']],
+        index=None,
+        help="Clique em uma das opções geradas pela IA"
+    )
+
+    if sub_selecionado:
+        adiantar_no('probs_lista', 'problemas', prompt_problemas(sub_selecionado), tema_escolhido=sub_selecionado)
+
+    with st.form("form_subtema", border=False):
+        outra_opcao = st.text_input("Ou ajuste o subtema selecionado (ou digite um novo) aqui:")
+        col_acc1, col_acc2 = st.columns(2)
+        with col_acc1:
+            confirmar = st.form_submit_button("Confirmar Subtema")
+        with col_acc2:
+            manter = st.form_submit_button("⏩ Manter Tema Original")
+
+    if confirmar:
+        escolha_final = outra_opcao if outra_opcao.strip() else sub_selecionado
+        if escolha_final:
+            escolher(tema_escolhido=escolha_final)
+        else:
+            st.warning("Selecione uma opção ou descreva seu tema.")
+
+    if manter:
+        escolher(tema_escolhido=st.session_state.dados['tema_base'])
+
+@painel_isolado
+def painel_escolha_problema():
+    # Interface de Seleção por Clique
+    prob_selecionado = st.radio(
+        "Selecione a pergunta norteadora do seu trabalho:",
+        [item['titulo'] for item in st.session_state.dados['probs_lista']],
+        index=None
+    )
+
+    if prob_selecionado:
+        adiantar_no('lista_objs', 'objetivos', prompt_objetivos(st.session_state.dados['tema_escolhido'], prob_selecionado),
+                    problema_pesquisa=prob_selecionado)
+
+    with st.form("form_problema", border=False):
+        ajuste_prob = st.text_area("Deseja editar ou escrever seu próprio problema?",
+                                   placeholder="Se selecionou uma opção acima e quer mudar algo, escreva aqui.")
+        confirmar = st.form_submit_button("Confirmar Problema de Pesquisa")
+    if confirmar:
+        escolha_final = ajuste_prob if ajuste_prob.strip() else prob_selecionado
+        if escolha_final:
+            escolher(problema_pesquisa=escolha_final)
+        else:
+            st.warning("Por favor, selecione uma das opções acima.")
 
-def call_gpt(prompt):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-5.1", 
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Erro na API: {e}"
+@painel_isolado
+def painel_objetivos():
+    st.markdown("### Selecione os objetivos que farão parte do seu trabalho:")
+
+    # Lógica Original de Seleção (Checkboxes), enviada de uma vez no "Confirmar Objetivos"
+    selecionados = []
+    with st.form("form_objetivos", border=False):
+        for i, obj in enumerate(st.session_state.dados['lista_objs']):
+            if st.checkbox(f"**{obj['titulo']}**", key=f"obj_{i}"):
+                selecionados.append(obj['titulo'])
+            st.caption(obj['justificativa'])
+        confirmar = st.form_submit_button("Confirmar Objetivos")
+
+    if confirmar:
+        if selecionados:
+            # Mantém a numeração "1. ..." esperada pela consolidação do passo 6
+            escolher(objetivos="\n".join(f"{i}. {obj}" for i, obj in enumerate(selecionados, 1)))
+        else:
+            st.warning("Selecione ao menos um objetivo antes de avançar.")
+
+# Voltar a um passo não apaga nada: só o que depender de uma escolha diferente é refeito
+if st.session_state.step > 1:
+    with st.expander("↩ Rever uma escolha anterior"):
+        st.caption("Ao confirmar uma escolha diferente, só os passos que dependem dela são gerados de novo; "
+                   "confirmando a mesma, você volta direto para onde estava.")
+        colunas = st.columns(4)
+        for coluna, (passo, rotulo) in zip(colunas, ((1, "Tema base"), (2, "Subtema"), (3, "Problema"), (4, "Objetivos"))):
+            if passo < st.session_state.step and coluna.button(f"Passo {passo}: {rotulo}", key=f"rever_{passo}"):
+                st.session_state.step = passo
+                st.rerun()
 
 area = ""
 
@@ -41,60 +470,39 @@ if st.session_state.step == 1:
     
     st.markdown("---")
     
+    # Ao voltar ao passo 1 (ou retomar um plano), os campos voltam com a área e a ideia do plano:
+    # o Streamlit descarta o estado dos campos enquanto eles não aparecem na tela
+    if "campo_area" not in st.session_state:
+        st.session_state.campo_area = st.session_state.dados.get('area_usuario', '')
+    if "campo_ideia" not in st.session_state:
+        st.session_state.campo_ideia = st.session_state.dados.get('ideia_usuario', '')
+
     col1, col2 = st.columns(2)
     with col1:
-        area = st.text_input("Área do Conhecimento", placeholder="Ex: Psicologia Organizacional")
+        area = st.text_input("Área do Conhecimento", placeholder="Ex: Psicologia Organizacional", key="campo_area")
     with col2:
         st.markdown("Descreva sua ideia aqui o mais detalhado possível", unsafe_allow_html=True)
-        ideia_bruta = st.text_area(label="Descricao", label_visibility="collapsed", placeholder="Ex: Quero escrever sobre...")
+        ideia_bruta = st.text_area(label="Descricao", label_visibility="collapsed", placeholder="Ex: Quero escrever sobre...", key="campo_ideia")
 
     # Inicializa a lista de temas se não existir
     if "lista_temas_sugeridos" not in st.session_state:
         st.session_state.lista_temas_sugeridos = []
+        st.session_state.pool_temas = []
+        st.session_state.recarga_temas = None
 
-    def gerar_temas(adicional=False):
-        # Se for uma nova busca, limpamos o que existia
+    def gerar_temas(adicional=False, usar_cache=True):
+        # Nova busca: gera o pool inicial e descarta o que existia (só depois de a chamada dar certo)
         if not adicional:
+            pool = deduplicar_temas(coletar_temas(encomendar_temas(area, ideia_bruta, usar_cache=usar_cache)))
             st.session_state.lista_temas_sugeridos = []
-
-        # Criamos o contexto de exclusão com base em TUDO que já foi mostrado
-        exclusao = "\n".join(st.session_state.lista_temas_sugeridos)
-        contexto_exclusao = f"\nNÃO repita nenhum destes temas:\n{exclusao}" if exclusao else ""
-
-        prompt = f"""Você é um especialista em metodologia de pesquisa científica com ampla experiência 
-            em orientação de trabalhos de conclusão de curso na área de {area}.
-
-            Sua tarefa é sugerir temas viáveis para uma monografia no formato de revisão 
-            integrativa da literatura.
-
-            Contexto fornecido pelo estudante:
-            - Área de conhecimento: {area}
-            - Ideia ou interesse inicial: {ideia_bruta}
-
-            Critérios para os temas sugeridos:
-            - Devem ser adequados ao escopo de uma revisão integrativa (ou seja, precisam 
-            ter literatura científica suficiente para ser revisada)
-            - Devem ser específicos o bastante para um TCC de graduação, sem serem amplos 
-            demais nem restritos demais
-            - Devem estar alinhados com o interesse inicial do estudante, explorando 
-            variações, recortes e abordagens diferentes
-            - Devem ser formulados como títulos acadêmicos, de forma clara e objetiva
-
-            {contexto_exclusao}
-
-            Gere exatamente 10 sugestões de temas, apresentadas em lista numerada de 1 a 10, 
-            contendo apenas os títulos, sem explicações ou comentários adicionais."""
-        
-        resposta = call_gpt(prompt)
-        linhas = resposta.strip().split('\n')
-        # Extrai o texto ignorando o número inicial
-        novos_temas = [l.split('.', 1)[-1].strip() for l in linhas if l.strip() and l[0].isdigit()]
-        
-        # CONCATENA: Adiciona os novos temas à lista existente
-        st.session_state.lista_temas_sugeridos.extend(novos_temas)
+            st.session_state.pool_temas = pool
+            st.session_state.recarga_temas = None
+        servir_pagina_temas(area, ideia_bruta)
 
     col_btn1, col_btn2 = st.columns(2)
     with col_btn1:
+        ignorar_cache = st.checkbox("Gerar sugestões inéditas",
+                                    help="Ignora as sugestões já geradas antes para a mesma área e ideia.")
         if st.button("Gerar Sugestões Iniciais"):
             # Lógica de validação obrigatória
             if not area.strip() and not ideia_bruta.strip():
@@ -104,16 +512,22 @@ if st.session_state.step == 1:
             elif not ideia_bruta.strip():
                 st.warning("O campo **Descreva sua ideia** é obrigatório.")
             else:
-                with st.spinner("O orientador IA está redigindo os temas..."):
-                    gerar_temas(adicional=False)
+                try:
+                    with st.spinner("O orientador IA está redigindo os temas..."):
+                        gerar_temas(adicional=False, usar_cache=not ignorar_cache)
+                except ErroLLM as e:
+                    parar_com_erro(e)
                 st.rerun()
             
     with col_btn2:
         # O botão "Gerar +10" herda a validação pois a lista só existirá se o Passo 1 for bem-sucedido
         if st.session_state.lista_temas_sugeridos:
             if st.button("🔄 Gerar +10 Sugestões (Acumular)"):
-                with st.spinner("Buscando novas abordagens e acumulando..."):
-                    gerar_temas(adicional=True)
+                try:
+                    with st.spinner("Buscando novas abordagens e acumulando..."):
+                        gerar_temas(adicional=True)
+                except ErroLLM as e:
+                    parar_com_erro(e)
                 st.rerun()
 
     # Exibição acumulada
@@ -124,27 +538,20 @@ if st.session_state.step == 1:
 
         st.info(f"""{len(st.session_state.lista_temas_sugeridos)} sugestões geradas até agora.\n
                 Clique em Gerar Sugestões Iniciais para descartar as atuais e começar do zero,
-                ou em Gerar +10 para manter as atuais e adicionar mais 10 sugestões.""")        
-        
-        tema_selecionado = st.radio(
-            "Selecione o tema que deseja utilizar:",
-            st.session_state.lista_temas_sugeridos,
-            index=None,
-            help="Esta lista contém todas as sugestões geradas nesta sessão."
-        )
-        
-        outra_opcao = st.text_input("Ou ajuste o tema selecionado (ou digite um novo) aqui:")
-        
-        if st.button("Avançar para Aprofundamento"):
-                    escolha_final = outra_opcao if outra_opcao.strip() else tema_selecionado
-                    if escolha_final:
-                        # ADICIONE ESTAS DUAS LINHAS:
-                        st.session_state.dados['area_usuario'] = area
-                        st.session_state.dados['ideia_usuario'] = ideia_bruta
-                        
-                        st.session_state.dados['tema_base'] = escolha_final
-                        st.session_state.step = 2
-                        st.rerun()
+                ou em Gerar +10 para manter as atuais e adicionar mais 10 sugestões.""")
+
+        painel_escolha_tema(area, ideia_bruta)
+
+    with st.expander("Retomar um plano salvo"):
+        codigo = st.text_input("Código do plano", placeholder="Ex: 3f2a9c...").strip()
+        if st.button("Retomar plano"):
+            if codigo and armazem_padrao().carregar(codigo) is not None:
+                # O progresso atual já está salvo; a próxima execução carrega o plano do código
+                st.session_state.clear()
+                st.query_params["sessao"] = codigo
+                st.rerun()
+            else:
+                st.error("Nenhum plano encontrado com esse código.")
 
 # --- AGENTE 2: APROFUNDAMENTO ---
 elif st.session_state.step == 2:
@@ -153,68 +560,17 @@ elif st.session_state.step == 2:
     st.info(f"**Tema Base Selecionado:** {st.session_state.dados['tema_base']}")
     st.divider()
 
-    if "subtemas_lista" not in st.session_state:
+    if "subtemas_lista" not in st.session_state.dados:
         with st.spinner("O orientador está gerando subtemas específicos..."):
 
-            prompt = f"""
-                    Você é um especialista em metodologia de pesquisa científica com ampla experiência 
-                    em revisões integrativas da literatura na área de {area}.
-
-                    Sua tarefa é mapear os principais subtemas que compõem ou se relacionam diretamente 
-                    com o seguinte tema de pesquisa:
-
-                    Tema central: {st.session_state.dados['tema_base']}
-
-                    Entende-se por subtema um recorte temático específico que pode ser investigado 
-                    de forma independente dentro do tema central, com literatura científica própria 
-                    e relevância para uma revisão integrativa de TCC de graduação.
-
-                    Critérios para as sugestões:
-                    - Devem ser recortes diretos do tema central, não tópicos periféricos ou tangenciais
-                    - Devem ter literatura científica disponível suficiente para uma revisão integrativa
-                    - Devem variar entre recortes conceituais, populacionais, contextuais e aplicados,
-                    sempre que pertinente ao tema
-                    - Devem ser viáveis no escopo de um TCC de graduação
-                    
-                    Output:
-                    Gere exatamente 10 sugestões de subtemas em lista numerada de 1 a 10.
-                    Cada item deve conter o título do subtema escrito em negrito seguido de uma breve justificativa 
-                    acadêmica de sua relevância para o tema central, no seguinte formato:
-                    {{título do subtema}}: {{justificativa}};
-                    Use linguagem acadêmica formal.
-                    """
+            prompt = prompt_subtemas(st.session_state.dados.get('area_usuario', ''), st.session_state.dados['tema_base'])
             
-            res = call_gpt(prompt)
-                        # Processa a resposta para garantir uma lista limpa
-            st.session_state.subtemas_lista = [l.split('.', 1)[-1].strip() if '.' in l[:3] else l.strip() 
-                                            for l in res.strip().split('\n') if l.strip()]
+            try:
+                gerar_no('subtemas_lista', lambda: gerar_lista_antecipada('subtemas_lista', 'subtemas', prompt))
+            except ErroLLM as e:
+                parar_com_erro(e)
 
-    # Interface de Seleção por Clique
-    sub_selecionado = st.radio(
-        "Selecione um recorte específico para sua pesquisa:",
-        st.session_state.subtemas_lista,
-        index=None,
-        help="Clique em uma das opções geradas pela IA"
-    )
-    
-    outra_opcao = st.text_input("Ou ajuste o subtema selecionado (ou digite um novo) aqui:")
-
-    col_acc1, col_acc2 = st.columns(2)
-    with col_acc1:
-        if st.button("Confirmar Subtema"):
-            escolha_final = outra_opcao if outra_opcao.strip() else sub_selecionado
-            if escolha_final:
-                st.session_state.dados['tema_escolhido'] = escolha_final
-                st.session_state.step = 3
-                st.rerun()
-            else:
-                st.warning("Selecione uma opção ou descreva seu tema.")
-
-    with col_acc2:
-        if st.button("⏩ Manter Tema Original"):
-            st.session_state.dados['tema_escolhido'] = st.session_state.dados['tema_base']
-            st.session_state.step = 3
-            st.rerun()
+    painel_escolha_subtema()
 
 
 
@@ -235,55 +591,16 @@ elif st.session_state.step == 3:
     
     st.divider()
 
-    if "probs_lista" not in st.session_state:
+    if "probs_lista" not in st.session_state.dados:
         with st.spinner("Formulando problemas de pesquisa..."):
-            prompt = f"""Você é um especialista em metodologia de pesquisa científica com ampla experiência 
-                            em revisões integrativas da literatura.
-
-                            Sua tarefa é formular problemas de pesquisa adequados para uma monografia no 
-                            formato de revisão integrativa da literatura, a partir do seguinte tema:
-
-                            Tema escolhido: {st.session_state.dados['tema_escolhido']}
-
-                            Entende-se por problema de pesquisa uma pergunta clara, delimitada e investigável 
-                            que orienta toda a revisão, cuja resposta pode ser construída a partir da análise 
-                            crítica da literatura científica existente — sem coleta de dados primários.
-
-                            Critérios para as sugestões:
-                            - Devem ser perguntas respondíveis por meio de revisão da literatura, 
-                            não por experimentos ou coleta de dados primários
-                            - Devem ter escopo adequado a um TCC de graduação: nem amplos demais 
-                            (impossíveis de responder) nem restritos demais (literatura insuficiente)
-                            - Devem variar em abordagem: algumas focando em relações entre variáveis, 
-                            outras em lacunas do conhecimento, outras em comparações ou tendências 
-                            identificadas na literatura
-                            - Devem ser formulados de forma clara, objetiva e em linguagem acadêmica formal
-
-                            Gere exatamente 10 sugestões de problema de pesquisa em lista numerada de 1 a 10,
-                            apresentando apenas as perguntas, sem comentários ou explicações adicionais."""
+            prompt = prompt_problemas(st.session_state.dados['tema_escolhido'])
             
-            res_bruta = call_gpt(prompt)
-            st.session_state.probs_lista = [l.split('.', 1)[-1].strip() if '.' in l[:3] else l.strip() 
-                                           for l in res_bruta.strip().split('\n') if l.strip()]
+            try:
+                gerar_no('probs_lista', lambda: gerar_lista_antecipada('probs_lista', 'problemas', prompt))
+            except ErroLLM as e:
+                parar_com_erro(e)
 
-    # Interface de Seleção por Clique
-    prob_selecionado = st.radio(
-        "Selecione a pergunta norteadora do seu trabalho:",
-        st.session_state.probs_lista,
-        index=None
-    )
-
-    ajuste_prob = st.text_area("Deseja editar ou escrever seu próprio problema?", 
-                               placeholder="Se selecionou uma opção acima e quer mudar algo, escreva aqui.")
-
-    if st.button("Confirmar Problema de Pesquisa"):
-        escolha_final = ajuste_prob if ajuste_prob.strip() else prob_selecionado
-        if escolha_final:
-            st.session_state.dados['problema_pesquisa'] = escolha_final
-            st.session_state.step = 4
-            st.rerun()
-        else:
-            st.warning("Por favor, selecione uma das opções acima.")
+    painel_escolha_problema()
 
 # --- AGENTE 4: OBJETIVOS ---
 elif st.session_state.step == 4:
@@ -302,57 +619,16 @@ elif st.session_state.step == 4:
     st.divider()
 
     # Lógica Original de Geração
-    if "lista_objs" not in st.session_state:
+    if "lista_objs" not in st.session_state.dados:
         with st.spinner("Gerando sugestões de objetivos..."):
-            prompt = f"""Você é um especialista em metodologia de pesquisa científica com ampla experiência 
-                em revisões integrativas da literatura.
-
-                Sua tarefa é sugerir objetivos específicos adequados para uma monografia no 
-                formato de revisão integrativa da literatura, com base no seguinte contexto:
-
-                Tema: {st.session_state.dados['tema_escolhido']}
-                Problema de pesquisa: {st.session_state.dados['problema_pesquisa']}
-
-                Entende-se por objetivo específico um desdobramento operacional do objetivo geral, 
-                que descreve uma etapa concreta e alcançável da pesquisa. Em uma revisão integrativa, 
-                os objetivos específicos tipicamente envolvem ações como identificar, descrever, 
-                analisar, comparar, sintetizar ou discutir aspectos da literatura sobre o tema.
-
-                Critérios para as sugestões:
-                - Devem ser diretamente derivados do problema de pesquisa apresentado
-                - Devem ser alcançáveis exclusivamente por meio da análise da literatura científica,
-                sem coleta de dados primários
-                - Devem ser redigidos com verbo no infinitivo no início da frase, 
-                conforme norma acadêmica (ex: Identificar, Analisar, Comparar, Sintetizar)
-                - Devem ser complementares entre si, cobrindo diferentes dimensões do problema,
-                sem sobreposição ou redundância
-                - Devem ter escopo adequado a um TCC de graduação
-
-                Gere exatamente 10 sugestões em lista numerada de 1 a 10.
-                Cada item deve conter:
-                - O objetivo específico redigido em uma frase iniciada por verbo no infinitivo
-                - Uma explicação em até dois parágrafos justificando sua relevância e como 
-                ele contribui para responder ao problema de pesquisa"""
-
-            res = call_gpt(prompt)
-            # Mantendo sua lógica de parsing original do arquivo app3.py
-            st.session_state.lista_objs = [l.strip() for l in res.split('\n') if l.strip() and any(c.isdigit() for c in l[:3])]
+            prompt = prompt_objetivos(st.session_state.dados['tema_escolhido'], st.session_state.dados['problema_pesquisa'])
 
-    st.markdown("### Selecione os objetivos que farão parte do seu trabalho:")
-    
-    # Lógica Original de Seleção (Checkboxes)
-    selecionados = []
-    for i, obj in enumerate(st.session_state.lista_objs):
-        if st.checkbox(obj, key=f"obj_{i}"):
-            selecionados.append(obj)
-            
-    if st.button("Confirmar Objetivos"):
-        if selecionados:
-            st.session_state.dados['objetivos'] = "\n".join(selecionados)
-            st.session_state.step = 5
-            st.rerun()
-        else:
-            st.warning("Selecione ao menos um objetivo antes de avançar.")
+            try:
+                gerar_no('lista_objs', lambda: gerar_lista_antecipada('lista_objs', 'objetivos', prompt))
+            except ErroLLM as e:
+                parar_com_erro(e)
+
+    painel_objetivos()
 
 # # --- AGENTE 5 & 6: REFERÊNCIAS E ESTRATÉGIA ---
 elif st.session_state.step == 5:
@@ -366,159 +642,47 @@ elif st.session_state.step == 5:
     with c3: st.warning(f"**Objetivos**\n\n{st.session_state.dados.get('objetivos', '')}")
     st.divider()
 
-    if "ref_classicas" not in st.session_state.dados:
-        with st.spinner("Construindo base teórica e estratégia de busca... Essa etapa pode demorar alguns minutos"):
-            # --- Agente 5: Referencial Teórico Categorizado ---
-            p5 = f"""Você é um especialista em metodologia de pesquisa científica e revisão de literatura,
-                com conhecimento aprofundado sobre o campo de {area}.
-
-                Sua tarefa é mapear o panorama intelectual da literatura sobre o tema a seguir,
-                auxiliando um estudante de graduação a compreender as bases teóricas antes de 
-                iniciar sua revisão integrativa.
-
-                Tema: {st.session_state.dados['tema_escolhido']}
-
-                Sua resposta deve ser organizada em duas partes:
+    # Um texto já gerado para o mesmo tema (antes de rever uma escolha) é reaproveitado
+    for chave in ('ref_classicas', 'ref_atuais'):
+        if chave not in st.session_state.dados:
+            memorizado = GRAFO_PLANO.memorizado(st.session_state.dados, st.session_state.grafo_plano, chave)
+            if memorizado is not None:
+                GRAFO_PLANO.registrar(st.session_state.dados, st.session_state.grafo_plano, chave, memorizado)
 
-                PARTE 1 — MAPA DA LITERATURA
-
-                Apresente uma tabela em formato Markdown com as seguintes colunas:
-                Autor | Obra ou Linha de Pesquisa | Período de Influência | Contribuição para o Tema
-
-                Inclua entre 8 e 12 entradas, distribuídas entre:
-                - Autores e obras seminais que estabeleceram os fundamentos do tema
-                - Autores contemporâneos de referência que consolidaram ou expandiram o campo
-
-                ATENÇÃO: Inclua apenas autores e obras dos quais você tenha alta certeza de 
-                existência e conteúdo. Se não tiver certeza sobre um título exato, descreva 
-                a linha de pesquisa do autor em vez de arriscar um título incorreto.
-
-                PARTE 2 — CORRENTES DE PENSAMENTO
-
-                Em linguagem acadêmica formal, descreva em 2 a 3 parágrafos as principais 
-                correntes teóricas ou perspectivas identificadas na literatura sobre o tema, 
-                destacando convergências, divergências e eventuais lacunas que justificam 
-                novas revisões sobre o assunto."""
-            
-            st.session_state.dados['ref_classicas'] = call_gpt(p5)
-
-# --- Agente 6: Estratégia Avançada (Validada via DeCS/MeSH) ---
-            ano_atual = datetime.now().year
-            ano_inicial = ano_atual - 5
-            
-            p6 = f"""Você é um especialista em Biblioteconomia, Ciência da Informação e recuperação 
-                de informação em bases de dados científicas, com amplo conhecimento sobre os 
-                vocabulários controlados DeCS (Descritores em Ciências da Saúde) e MeSH 
-                (Medical Subject Headings).
-
-                Sua tarefa é construir uma estratégia de busca estruturada para uma revisão 
-                integrativa da literatura sobre o tema a seguir:
-
-                Tema: {st.session_state.dados['tema_escolhido']}
-                Período: {ano_inicial} a {ano_atual}
-                Idiomas: Português, Inglês e Espanhol
-
-                INSTRUÇÃO CRÍTICA SOBRE DESCRITORES:
-                Inclua APENAS descritores dos quais você tenha alta certeza de que são termos 
-                controlados válidos no DeCS ou MeSH. Se não tiver certeza sobre um descritor 
-                específico, substitua-o por um termo livre relevante e sinalize claramente 
-                que se trata de termo livre (não controlado). Nunca apresente um termo livre 
-                como se fosse descritor controlado.
-
-                Organize sua resposta nas seguintes seções:
-
-                SEÇÃO 1 — DESCRITORES IDENTIFICADOS
-
-                Apresente uma tabela Markdown com as colunas:
-                Descritor (PT) | Descritor (EN) | Fonte (DeCS / MeSH / Termo Livre) | Observação
-
-                SEÇÃO 2 — STRINGS DE BUSCA
-
-                Para cada base abaixo, apresente a string em bloco de código, 
-                construída com operadores booleanos (AND, OR, NOT) e, quando aplicável, 
-                com uso de aspas para expressões exatas e truncamento (*):
-                ```pubmed
-                [string para PubMed]
-                ```
-                ```scielo
-                [string para SciELO]
-                ```
-                ```lilacs
-                [string para Lilacs]
-                ```
-                ```google_academico
-                [string para Google Acadêmico]
-                ```
-
-                SEÇÃO 3 — FILTROS RECOMENDADOS
-
-                Descreva os filtros a serem aplicados em cada base para restringir os 
-                resultados ao período {ano_inicial}–{ano_atual} e aos idiomas definidos,
-                considerando as particularidades de cada plataforma.
-
-                SEÇÃO 4 — ORIENTAÇÕES DE USO
-
-                Em até um parágrafo por base, oriente o estudante sobre como aplicar 
-                a string e os filtros na interface de cada plataforma, e recomende que 
-                todos os descritores sejam verificados diretamente no portal DeCS 
-                (decs.bvsalud.org) e no MeSH (meshb.nlm.nih.gov) antes do uso."""
-            
-            st.session_state.dados['ref_atuais'] = call_gpt(p6)
-            
-            st.session_state.step = 6
+    if "ref_classicas" not in st.session_state.dados or "ref_atuais" not in st.session_state.dados:
+        with st.spinner("Construindo base teórica e estratégia de busca em paralelo... Essa etapa pode demorar alguns minutos"):
+            # --- Agente 5: Referencial Teórico Categorizado ---
+            p5 = prompt_referencial(st.session_state.dados.get('area_usuario', ''), st.session_state.dados['tema_escolhido'])
+            p6 = prompt_estrategia(st.session_state.dados['tema_escolhido'])
+
+            # Agentes 5 e 6 não dependem um do outro: rodam em paralelo.
+            # Numa nova tentativa, só roda o agente que ainda não terminou.
+            pendentes = {
+                chave: tarefa for chave, tarefa in {
+                    'ref_classicas': ("Agente 5 (Referencial Teórico)", "referencial", p5),
+                    'ref_atuais': ("Agente 6 (Estratégia de Busca)", "estrategia", p6),
+                }.items() if chave not in st.session_state.dados
+            }
+            for chave, texto in executar_agentes_em_paralelo(pendentes, PRAZO_AGENTES_5_6).items():
+                GRAFO_PLANO.registrar(st.session_state.dados, st.session_state.grafo_plano, chave, texto)
+
+    if all(chave in st.session_state.dados for chave in ('ref_classicas', 'ref_atuais')):
+        registro_padrao().registrar_plano(st.session_state.id_sessao)
+        st.session_state.step = 6
+        st.rerun()
+    else:
+        st.error("Não foi possível concluir todos os agentes. Os resultados já concluídos foram mantidos.")
+        if st.button("Tentar novamente"):
             st.rerun()
 
 # --- AGENTE 7: CONSOLIDAÇÃO E EXPORTAÇÃO ---
 elif st.session_state.step == 6:
     #st.header("Agente 7: Consolidação e Exportação")
     
-    # Processamento dos objetivos para numeração progressiva
-    objetivos_brutos = st.session_state.dados.get('objetivos', '')
-    lista_objetivos = [obj.split('.', 1)[-1].strip() for obj in objetivos_brutos.split('\n') if obj.strip()]
-    objetivos_numerados = ""
-    for idx, obj in enumerate(lista_objetivos, 1):
-        objetivos_numerados += f"{idx}. {obj}\n"
-
-    # Preparação do conteúdo Markdown
-# Preparação do conteúdo Markdown
-    def gerar_conteudo_markdown():
-        # Resgatando os dados exatos salvos no Agente 1
-        area_user = st.session_state.dados.get('area_usuario', 'Não informada')
-        ideia_user = st.session_state.dados.get('ideia_usuario', 'Não informada')
-
-        md_text = f"""# Plano de Trabalho Acadêmico
----
-**Data de Geração:** {datetime.now().strftime('%d/%m/%Y %H:%M')}
-
-**Área informada:** {area_user}  
-**Ideia original digitada pelo usuário:** {ideia_user}
-
----
-
-## 1. Tema Principal
-{st.session_state.dados.get('tema_base', 'Não definido')}
-
-## 2. Subtema / Recorte Específico
-{st.session_state.dados.get('tema_escolhido', 'Mesmo que o tema principal')}
-
-## 3. Problema de Pesquisa
-{st.session_state.dados.get('problema_pesquisa', 'Não definido')}
-
-## 4. Objetivos Específicos
-{objetivos_numerados}
-
-## 5. Referencial Teórico (Autores e Obras)
-{st.session_state.dados.get('ref_classicas', 'Não gerado')}
-
-## 6. Estratégia de Busca (Metodologia)
-{st.session_state.dados.get('ref_atuais', 'Não gerada')}
-
----
-*Gerado pelo Sistema de IA para Monografia*
-"""
-        return md_text
-
-    conteudo_md = gerar_conteudo_markdown()
+    dados_plano = st.session_state.dados
+    assinatura = assinatura_plano(dados_plano)
+    gerado_em = datetime.now().replace(second=0, microsecond=0)
+    conteudo_md = exportar_plano(assinatura, "md", dados_plano, gerado_em)
 
     # Exibição na tela para conferência
     with st.expander("Visualizar rascunho completo", expanded=True):
@@ -530,10 +694,28 @@ elif st.session_state.step == 6:
     st.download_button(
         label="📥 Baixar Plano em Markdown (.md)",
         data=conteudo_md,
-        file_name=f"plano_monografia_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
-        mime="text/markdown"
+        file_name=f"plano_monografia_{gerado_em.strftime('%Y%m%d_%H%M')}.md",
+        mime="text/markdown",
+        on_click="ignore"
+    )
+
+    # O PDF só é montado quando o estudante pede o download (e fica memorizado)
+    st.download_button(
+        label="📥 Baixar Plano em PDF",
+        data=lambda: exportar_plano(assinatura, "pdf", dados_plano),
+        file_name=f"plano_monografia_{gerado_em.strftime('%Y%m%d_%H%M')}.pdf",
+        mime="application/pdf",
+        on_click="ignore"
     )
 
     if st.button("Reiniciar Sistema"):
         st.session_state.clear()
-        st.rerun()
\ No newline at end of file
+        # Sem o id no endereço, a próxima execução começa um plano novo
+        st.query_params.clear()
+        st.rerun()
+
+# Grava o que foi gerado nesta execução (listas, resultados dos agentes)
+salvar_progresso()
+
+# Com a página já desenhada, carrega o SDK da OpenAI e aquece a conexão em segundo plano
+preparar_em_segundo_plano()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
-from openai import OpenAI
+from cliente_openai import obter_cliente
+from resiliencia import ErroLLM, chamar_com_resiliencia, iterar_stream
 import os
 from dotenv import load_dotenv
 from fpdf import FPDF # Nova importação para PDF
@@ -10,7 +11,8 @@ from docx import Document
 
 # Carregar chave API do arquivo .env
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Cliente único por processo: reaproveita as conexões entre reruns e sessões
+client = obter_cliente()
 
 st.set_page_config(page_title="Agente Monografia", layout="wide")
 st.title("🎓 Sistema Agente Monografia")
@@ -21,15 +23,42 @@ if "step" not in st.session_state:
 if "dados" not in st.session_state:
     st.session_state.dados = {}
 
-def call_gpt(prompt):
+def call_gpt(prompt, timeout=60):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", 
-            messages=[{"role": "user", "content": prompt}]
+        response = chamar_com_resiliencia(
+            lambda timeout: client.chat.completions.create(
+                model="gpt-4o", 
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
+            ),
+            timeout
         )
         return response.choices[0].message.content
-    except Exception as e:
-        return f"Erro na API: {e}"
+    except ErroLLM as e:
+        # Interrompe o passo sem salvar a mensagem de erro na sessão
+        st.error(e.mensagem)
+        st.button("Tentar novamente")
+        st.stop()
+
+def call_gpt_stream(prompt, timeout=240):
+    """Versão em streaming de call_gpt: devolve os trechos do texto à medida que chegam."""
+    try:
+        stream = chamar_com_resiliencia(
+            lambda timeout: client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                timeout=timeout
+            ),
+            timeout
+        )
+        for chunk in iterar_stream(stream):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except ErroLLM as e:
+        st.error(e.mensagem)
+        st.button("Tentar novamente")
+        st.stop()
 
 # --- AGENTE 1: ESCOLHA DO TEMA ---
 if st.session_state.step == 1:
@@ -133,7 +162,8 @@ elif st.session_state.step == 5:
     
     with st.spinner("O Agente 5 está buscando referências clássicas..."):
         p5 = f"Quero escrever uma monografia que será uma revisão da literatura sobre o tema {st.session_state.dados['tema_escolhido']} trabalhando o problema de pesquisa {st.session_state.dados['problema_pesquisa']} com os seguintes objetivos específicos: {st.session_state.dados['objetivos']}. Quais os trabalhos mais clássicos sobre o tema, que eu não posso deixar de referenciar, e os autores mais importantes na atualidade?"
-        st.session_state.dados['ref_classicas'] = call_gpt(p5)
+        # Exibe o texto à medida que é gerado
+        st.session_state.dados['ref_classicas'] = st.write_stream(call_gpt_stream(p5))
         
     with st.spinner("O Agente 6 está construindo a estratégia atualizada..."):
         ano_atual = datetime.now().year
@@ -145,7 +175,7 @@ elif st.session_state.step == 5:
         Parâmetros: Busca entre {ano_atual} e {ano_atual-5}. Idiomas: Português, Inglês, Espanhol.
         Bases: SciELO, Scopus, Web of Science, PubMed.
         Forneça: Conceitos atuais, referências recentes, lacunas, tendências e estratégias booleanas."""
-        st.session_state.dados['ref_atuais'] = call_gpt(p6)
+        st.session_state.dados['ref_atuais'] = st.write_stream(call_gpt_stream(p6))
     
     st.session_state.step = 6
     st.rerun()
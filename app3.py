@@ -1,14 +1,13 @@
 import streamlit as st
-from openai import OpenAI
-import os
+from cliente_openai import obter_cliente, preparar_em_segundo_plano
+from resiliencia import ErroLLM, chamar_com_resiliencia, iterar_stream
 from dotenv import load_dotenv
-from fpdf import FPDF
+from exportacao import assinatura_plano, criar_pdf
 from io import BytesIO
 from datetime import datetime
 
 # 1. Configurações Iniciais
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 st.set_page_config(page_title="Agente Monografia", layout="wide")
 st.title("🎓 Sistema de IA para Monografia")
@@ -19,15 +18,46 @@ if "step" not in st.session_state:
 if "dados" not in st.session_state:
     st.session_state.dados = {}
 
-def call_gpt(prompt):
+@st.cache_data(max_entries=200, show_spinner=False)
+def pdf_do_plano(assinatura, _dados):
+    return criar_pdf(_dados)
+
+def call_gpt(prompt, timeout=60):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", 
-            messages=[{"role": "user", "content": prompt}]
+        response = chamar_com_resiliencia(
+            lambda timeout: obter_cliente().chat.completions.create(
+                model="gpt-4o", 
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
+            ),
+            timeout
         )
         return response.choices[0].message.content
-    except Exception as e:
-        return f"Erro na API: {e}"
+    except ErroLLM as e:
+        # Interrompe o passo sem salvar a mensagem de erro na sessão
+        st.error(e.mensagem)
+        st.button("Tentar novamente")
+        st.stop()
+
+def call_gpt_stream(prompt, timeout=240):
+    """Versão em streaming de call_gpt: devolve os trechos do texto à medida que chegam."""
+    try:
+        stream = chamar_com_resiliencia(
+            lambda timeout: obter_cliente().chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                timeout=timeout
+            ),
+            timeout
+        )
+        for chunk in iterar_stream(stream):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except ErroLLM as e:
+        st.error(e.mensagem)
+        st.button("Tentar novamente")
+        st.stop()
 
 area = ""
 
@@ -274,7 +304,7 @@ elif st.session_state.step == 5:
     with c3: st.warning(f"**Objetivos**\n\n{st.session_state.dados.get('objetivos', '')}")
     st.divider()
 
-    if "ref_classicas" not in st.session_state.dados:
+    if "ref_classicas" not in st.session_state.dados or "ref_atuais" not in st.session_state.dados:
         with st.spinner("Construindo base teórica e estratégia de busca..."):
             # --- Agente 5: Referencial Teórico Categorizado ---
             p5 = f"""Atue como um bibliotecário acadêmico. Para o tema '{st.session_state.dados['tema_escolhido']}', 
@@ -284,7 +314,10 @@ elif st.session_state.step == 5:
             1. Uma tabela Markdown com as colunas: Autor | Obra Principal | Contribuição para o Tema.
             2. Breve descrição das principais correntes de pensamento identificadas."""
             
-            st.session_state.dados['ref_classicas'] = call_gpt(p5)
+            # Exibe o texto à medida que é gerado
+            # Se o Agente 6 falhou numa tentativa anterior, o Agente 5 não é refeito
+            if 'ref_classicas' not in st.session_state.dados:
+                st.session_state.dados['ref_classicas'] = st.write_stream(call_gpt_stream(p5))
 
 # --- Agente 6: Estratégia Avançada (Validada via DeCS/MeSH) ---
             ano_atual = datetime.now().year
@@ -304,7 +337,7 @@ elif st.session_state.step == 5:
             
             Apresente as strings de busca em blocos de código para facilitar a cópia."""
             
-            st.session_state.dados['ref_atuais'] = call_gpt(p6)
+            st.session_state.dados['ref_atuais'] = st.write_stream(call_gpt_stream(p6))
             
             st.session_state.step = 6
             st.rerun()
@@ -335,51 +368,19 @@ elif st.session_state.step == 6:
         st.write(conteudo)
         st.divider()
 
-    def criar_pdf():
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        
-        pdf.set_font("helvetica", 'B', 18)
-        pdf.cell(0, 15, "Plano de Trabalho Academico", ln=True, align='C')
-        pdf.line(10, 25, 200, 25)
-        pdf.ln(10)
-        
-        for label, conteudo in exibicao_pdf:
-            pdf.set_fill_color(240, 240, 240)
-            pdf.set_font("helvetica", 'B', 12)
-            label_pdf = label.encode('latin-1', 'replace').decode('latin-1')
-            pdf.cell(0, 10, label_pdf, ln=True, fill=True)
-            pdf.ln(3)
-            
-            pdf.set_font("helvetica", size=10)
-            # Limpeza de caracteres Markdown que o PDF não suporta
-            texto_limpo = str(conteudo).replace('###', '').replace('**', '').replace('`', '')
-            linhas = texto_limpo.split('\n')
-            
-            for linha in linhas:
-                if '---' in linha and '|' in linha: continue
-                if '|' in linha: linha = linha.replace('|', '  ')
-                
-                txt_pdf = linha.encode('latin-1', 'replace').decode('latin-1')
-                pdf.multi_cell(0, 6, txt_pdf)
-            
-            pdf.ln(5)
-            
-        return pdf.output()
-
-    try:
-        pdf_bytes = criar_pdf()
-        if pdf_bytes:
-            st.download_button(
-                label="📥 Baixar Plano de Monografia Completo", 
-                data=pdf_bytes, 
-                file_name="plano_monografia.pdf", 
-                mime="application/pdf"
-            )
-    except Exception as e:
-        st.error(f"Erro ao gerar o PDF: {e}")
+    # PDF montado só no clique do download e memorizado pelo conteúdo do plano
+    dados_plano = st.session_state.dados
+    st.download_button(
+        label="📥 Baixar Plano de Monografia Completo", 
+        data=lambda: pdf_do_plano(assinatura_plano(dados_plano), dados_plano), 
+        file_name="plano_monografia.pdf", 
+        mime="application/pdf",
+        on_click="ignore"
+    )
     
     if st.button("Reiniciar Sistema"):
         st.session_state.clear()
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+# Cliente único por processo, criado em segundo plano depois da primeira tela
+preparar_em_segundo_plano()
@@ -0,0 +1,264 @@
+"""Benchmark offline do fluxo completo do app (passos 1 a 6).
+
+Sobe o servidor simulado com as respostas gravadas, percorre o app.py com o
+AppTest do Streamlit como um estudante faria e mede, por fase, o tempo de
+execução do script e o tempo gasto esperando o modelo. Compara a mediana de
+cada fase com a linha de base gravada e termina com código 1 se alguma
+piorar além da tolerância. Com o plano pronto, revê escolhas anteriores e
+confere que voltar a uma delas não chama o modelo de novo.
+
+    python bench/benchmark.py                           # compara com a linha de base
+    python bench/benchmark.py --salvar-linha-de-base    # regrava a linha de base
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+LINHA_DE_BASE = os.path.join(PASTA_BENCH, "linha_de_base.json")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, PASTA_BENCH)
+
+from servidor_mock import RespostasGravadas, ServidorOpenAIMock  # noqa: E402
+
+FASES = [
+    "passo1_temas",
+    "passo1_mais10",
+    "passo2_subtemas",
+    "passo3_problemas",
+    "passo4_objetivos",
+    "passo5_referencial_estrategia",
+    "passo6_exportacao",
+]
+
+# Depois do plano pronto, o estudante revê escolhas anteriores: troca o subtema
+# (refaz os passos 3 a 5), volta ao primeiro (tudo vem da memória do plano) e
+# reconfirma o tema do passo 1. Fora do "tempo até o plano".
+FASES_REVISAO = [
+    "revisao_outro_subtema",
+    "revisao_subtema_original",
+    "revisao_mesmo_tema",
+]
+
+# Folga absoluta (s) somada à tolerância relativa, para fases muito curtas
+FOLGA_ABSOLUTA = 0.15
+
+
+def preparar_ambiente(servidor, pasta_temp):
+    """Aponta o app para o servidor simulado e isola cache, métricas e sessões em `pasta_temp`."""
+    os.environ.update(
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=servidor.url,
+        OPENAI_AQUECER="0",
+        CACHE_LLM_CAMINHO=os.path.join(pasta_temp, "respostas_llm.sqlite3"),
+        METRICAS_CAMINHO=os.path.join(pasta_temp, "metricas.sqlite3"),
+        SESSOES_CAMINHO=os.path.join(pasta_temp, "sessoes.sqlite3"),
+    )
+
+
+def _botao(at, inicio_rotulo):
+    return next(b for b in at.button if b.label.startswith(inicio_rotulo))
+
+
+def _checar(at, fase):
+    if at.exception:
+        raise RuntimeError(f"{fase}: {at.exception[0].value}")
+
+
+def percorrer_plano(servidor, tempo_leitura=0.0, area="Enfermagem",
+                    ideia="Burnout em enfermeiros de UTI", timeout=300, revisoes=True):
+    """Percorre um plano completo e devolve {fase: {"tempo_s", "espera_llm_s"}}.
+
+    A espera no modelo de uma fase soma as chamadas que terminaram durante
+    ela, inclusive as de segundo plano (busca antecipada e reposição de temas).
+
+    `tempo_leitura` simula o estudante lendo as opções antes de escolher
+    (é quando a busca antecipada do app trabalha); esse tempo não entra na
+    medição das fases. Com `revisoes`, percorre também as FASES_REVISAO.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=timeout)
+    at.run()
+    at.text_input(key="campo_area").input(area)
+    at.text_area[0].input(ideia)
+
+    medidas = {}
+
+    def medir(fase, acao):
+        espera_antes = servidor.tempo_total()
+        inicio = time.perf_counter()
+        acao()
+        medidas[fase] = {"tempo_s": time.perf_counter() - inicio,
+                         "espera_llm_s": servidor.tempo_total() - espera_antes}
+        _checar(at, fase)
+
+    def ler():
+        if tempo_leitura:
+            time.sleep(tempo_leitura)
+
+    medir("passo1_temas", lambda: _botao(at, "Gerar Sugestões Iniciais").click().run())
+    ler()
+    medir("passo1_mais10", lambda: _botao(at, "🔄 Gerar +10").click().run())
+    at.radio[0].set_value(at.radio[0].options[0]).run()
+    ler()
+    medir("passo2_subtemas", lambda: _botao(at, "Avançar para Aprofundamento").click().run())
+    at.radio[0].set_value(at.radio[0].options[0]).run()
+    ler()
+    medir("passo3_problemas", lambda: _botao(at, "Confirmar Subtema").click().run())
+    at.radio[0].set_value(at.radio[0].options[0]).run()
+    ler()
+    medir("passo4_objetivos", lambda: _botao(at, "Confirmar Problema").click().run())
+    # As caixas ficam num st.form: os valores só seguem junto com o envio
+    at.checkbox[0].check()
+    at.checkbox[1].check()
+    ler()
+    medir("passo5_referencial_estrategia", lambda: _botao(at, "Confirmar Objetivos").click().run())
+    if at.session_state.step != 6:
+        raise RuntimeError(f"o fluxo parou no passo {at.session_state.step}")
+    medir("passo6_exportacao", at.run)
+    if revisoes:
+        _rever_escolhas(servidor, at, medir)
+    return medidas
+
+
+def _rever_escolhas(servidor, at, medir):
+    """Revê escolhas do plano pronto (FASES_REVISAO), conferindo que o plano volta igual e sem chamadas."""
+    plano = dict(at.session_state.dados)
+
+    def refazer_subtema(opcao):
+        _botao(at, "Passo 2").click().run()
+        at.radio[0].set_value(at.radio[0].options[opcao]).run()
+        _botao(at, "Confirmar Subtema").click().run()
+        if at.session_state.step == 3:
+            at.radio[0].set_value(at.radio[0].options[0]).run()
+            _botao(at, "Confirmar Problema").click().run()
+            at.checkbox[0].check()
+            at.checkbox[1].check()
+            _botao(at, "Confirmar Objetivos").click().run()
+
+    def reconfirmar_tema():
+        _botao(at, "Passo 1").click().run()
+        if at.text_input(key="campo_area").value != plano["area_usuario"]:
+            raise RuntimeError("revisao_mesmo_tema: a área não voltou ao campo do passo 1")
+        at.radio[0].set_value(plano["tema_base"]).run()
+        _botao(at, "Avançar para Aprofundamento").click().run()
+
+    for fase, acao, sem_chamadas in (
+        ("revisao_outro_subtema", lambda: refazer_subtema(1), False),
+        ("revisao_subtema_original", lambda: refazer_subtema(0), True),
+        ("revisao_mesmo_tema", reconfirmar_tema, True),
+    ):
+        chamadas = len(servidor.requisicoes)
+        medir(fase, acao)
+        if at.session_state.step != 6:
+            raise RuntimeError(f"{fase}: o fluxo parou no passo {at.session_state.step}")
+        if sem_chamadas and (len(servidor.requisicoes) != chamadas or dict(at.session_state.dados) != plano):
+            raise RuntimeError(f"{fase}: o plano deveria voltar da memória, sem chamadas ao modelo")
+
+
+def resumir(execucoes):
+    """Mediana de cada fase e do tempo total até o plano, em segundos."""
+    fases = {}
+    for fase in FASES + [f for f in FASES_REVISAO if f in execucoes[0]]:
+        fases[fase] = {
+            "tempo_s": round(statistics.median(e[fase]["tempo_s"] for e in execucoes), 3),
+            "espera_llm_s": round(statistics.median(e[fase]["espera_llm_s"] for e in execucoes), 3),
+        }
+    total = statistics.median(sum(e[f]["tempo_s"] for f in FASES) for e in execucoes)
+    return {"fases": fases, "tempo_ate_plano_s": round(total, 3)}
+
+
+def comparar(atual, base, tolerancia):
+    """Lista as regressões (fase, base, atual) acima de `tolerancia` + FOLGA_ABSOLUTA."""
+    regressoes = []
+    pares = [(f, base["fases"][f]["tempo_s"], atual["fases"][f]["tempo_s"])
+             for f in FASES + FASES_REVISAO if f in base["fases"] and f in atual["fases"]]
+    pares.append(("tempo_ate_plano", base["tempo_ate_plano_s"], atual["tempo_ate_plano_s"]))
+    for nome, antes, agora in pares:
+        if agora > antes * (1 + tolerancia) + FOLGA_ABSOLUTA:
+            regressoes.append((nome, antes, agora))
+    return regressoes
+
+
+def imprimir(resumo, base=None):
+    print(f"{'fase':<32}{'tempo (s)':>12}{'espera LLM (s)':>16}{'base (s)':>12}")
+    for fase in resumo["fases"]:
+        m = resumo["fases"][fase]
+        antes = base["fases"].get(fase, {}).get("tempo_s") if base else None
+        print(f"{fase:<32}{m['tempo_s']:>12.3f}{m['espera_llm_s']:>16.3f}"
+              f"{'' if antes is None else f'{antes:.3f}':>12}")
+    antes = f"{base['tempo_ate_plano_s']:.3f}" if base else ""
+    print(f"{'tempo até o plano':<32}{resumo['tempo_ate_plano_s']:>12.3f}{'':>16}{antes:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.5, help="segundos até o primeiro token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=200.0)
+    parser.add_argument("--tempo-leitura", type=float, default=0.0,
+                        help="pausa (s) antes de cada escolha, como um estudante lendo as opções")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="piora relativa aceita em relação à linha de base (0.2 = 20%%)")
+    parser.add_argument("--linha-de-base", default=LINHA_DE_BASE)
+    parser.add_argument("--salvar-linha-de-base", action="store_true")
+    parser.add_argument("--gravacoes", default=os.path.join(PASTA_BENCH, "respostas_gravadas.json"))
+    args = parser.parse_args()
+
+    config = {"latencia": args.latencia, "tokens_por_segundo": args.tokens_por_segundo,
+              "tempo_leitura": args.tempo_leitura}
+    servidor = ServidorOpenAIMock(RespostasGravadas(args.gravacoes), latencia=args.latencia,
+                                  tokens_por_segundo=args.tokens_por_segundo).iniciar()
+    try:
+        with tempfile.TemporaryDirectory() as pasta_temp:
+            preparar_ambiente(servidor, pasta_temp)
+            from cache_llm import cache_padrao
+
+            execucoes = []
+            for i in range(args.repeticoes):
+                # Cada repetição mede o caminho frio, sem respostas no cache local
+                cache_padrao().limpar()
+                execucoes.append(percorrer_plano(servidor, args.tempo_leitura))
+                print(f"repetição {i + 1}/{args.repeticoes} concluída", file=sys.stderr)
+    finally:
+        servidor.parar()
+
+    resumo = dict(resumir(execucoes), config=config, repeticoes=args.repeticoes)
+
+    if args.salvar_linha_de_base:
+        with open(args.linha_de_base, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        imprimir(resumo)
+        print(f"\nLinha de base gravada em {args.linha_de_base}")
+        return 0
+
+    if not os.path.exists(args.linha_de_base):
+        imprimir(resumo)
+        print("\nSem linha de base para comparar; rode com --salvar-linha-de-base.")
+        return 0
+    with open(args.linha_de_base, encoding="utf-8") as f:
+        base = json.load(f)
+    imprimir(resumo, base)
+    if base.get("config") != config:
+        print(f"\nA linha de base foi gravada com outra configuração ({base.get('config')}); "
+              "comparação ignorada.")
+        return 0
+    regressoes = comparar(resumo, base, args.tolerancia)
+    if regressoes:
+        print(f"\nRegressão acima de {args.tolerancia:.0%}:")
+        for nome, antes, agora in regressoes:
+            print(f"  {nome}: {antes:.3f}s -> {agora:.3f}s")
+        return 1
+    print(f"\nSem regressões acima de {args.tolerancia:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
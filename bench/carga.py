@@ -0,0 +1,290 @@
+"""Teste de carga: uma turma inteira usando o app ao mesmo tempo.
+
+Sobe o app com `streamlit run` apontado para o servidor simulado e abre N
+sessões simultâneas pelo WebSocket do Streamlit, como N navegadores, cada
+uma percorrendo os passos 1 a 6 com pausas de leitura entre as escolhas.
+Informa vazão (planos por minuto), percentis de latência por passo e a
+memória (RSS) e o número de threads do processo do app durante o teste.
+
+Também mede as reexecuções de cada interação dentro dos painéis (marcar uma
+opção, uma caixa de objetivo): com --max-reexecucao o teste falha se o p90
+passar do limite, e --reexecucao-completa força o script inteiro a rodar a
+cada interação, para comparar com a reexecução só do st.fragment.
+
+    python bench/carga.py --sessoes 40 --chegada 60 --tempo-leitura 8
+    python bench/carga.py --sessoes 80 --max-reexecucao 0.25
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from cliente_streamlit import ClienteStreamlit
+from servidor_mock import RespostasGravadas, ServidorOpenAIMock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metricas import percentil  # noqa: E402
+
+FASES = [
+    "passo1_temas",
+    "passo1_mais10",
+    "passo2_subtemas",
+    "passo3_problemas",
+    "passo4_objetivos",
+    "passo5_referencial_estrategia",
+    "passo6_exportacao",
+]
+
+IDEIAS = [
+    "Burnout em enfermeiros de UTI",
+    "Saúde mental de técnicos de enfermagem",
+    "Sobrecarga de trabalho na atenção primária",
+    "Estresse ocupacional no pronto-socorro",
+    "Qualidade de vida de residentes de enfermagem",
+]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_app(url_modelo, pasta_temp, com_cache, prazo=60):
+    """Sobe o app.py com `streamlit run` e espera ele responder ao health check."""
+    porta = porta_livre()
+    ambiente = dict(
+        os.environ,
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=url_modelo,
+        CACHE_LLM_CAMINHO=os.path.join(pasta_temp, "respostas_llm.sqlite3"),
+        METRICAS_CAMINHO=os.path.join(pasta_temp, "metricas.sqlite3"),
+        SESSOES_CAMINHO=os.path.join(pasta_temp, "sessoes.sqlite3"),
+    )
+    if not com_cache:
+        # Cada estudante tem sua própria ideia: sem cache, todas as chamadas são pagas
+        ambiente["CACHE_LLM_TTL_HORAS"] = "0"
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(RAIZ, "app.py"),
+         "--server.headless", "true", "--server.port", str(porta),
+         "--browser.gatherUsageStats", "false"],
+        cwd=RAIZ, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"o app terminou ao iniciar:\n{processo.stderr.read().decode()}")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1):
+                return processo, url
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("o app não respondeu a tempo")
+
+
+def uso_processo(pid):
+    """(RSS em MB, número de threads) do processo, pelo /proc (Linux)."""
+    rss = threads = None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    rss = int(linha.split()[1]) / 1024
+                elif linha.startswith("Threads:"):
+                    threads = int(linha.split()[1])
+    except OSError:
+        saida = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+        rss = int(saida) / 1024 if saida.strip() else None
+    return rss, threads
+
+
+class MonitorProcesso:
+    """Amostra RSS e threads de um processo em segundo plano."""
+
+    def __init__(self, pid, intervalo=0.5):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.amostras = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.is_set():
+            self.amostras.append(uso_processo(self.pid))
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+    def resumo(self):
+        rss = [a[0] for a in self.amostras if a[0] is not None]
+        threads = [a[1] for a in self.amostras if a[1] is not None]
+        return {
+            "rss_inicial_mb": rss[0] if rss else None,
+            "rss_pico_mb": max(rss) if rss else None,
+            "threads_p50": percentil(threads, 50),
+            "threads_pico": max(threads) if threads else None,
+        }
+
+
+async def sessao(indice, url, args, atraso):
+    """Um estudante do início ao plano exportado; devolve ({fase: segundos}, [segundos por interação])."""
+    sorteio = random.Random(args.semente + indice)
+    await asyncio.sleep(atraso)
+    cliente = await ClienteStreamlit(url).conectar()
+    medidas = {}
+    reexecucoes = []
+
+    async def medir(fase, acao):
+        inicio = time.perf_counter()
+        await asyncio.wait_for(acao, args.timeout)
+        medidas[fase] = time.perf_counter() - inicio
+
+    async def ler():
+        await asyncio.sleep(args.tempo_leitura * sorteio.uniform(0.5, 1.5))
+
+    async def interagir(proto, valor):
+        inicio = time.perf_counter()
+        if await asyncio.wait_for(cliente.alterar(proto, valor, isolado=not args.reexecucao_completa), args.timeout):
+            reexecucoes.append(time.perf_counter() - inicio)
+
+    async def escolher():
+        radio = cliente.widget("radio")
+        await interagir(radio, sorteio.choice(radio.options))
+
+    try:
+        cliente.preencher(cliente.widget("text_input", "Área"), "Enfermagem")
+        cliente.preencher(cliente.widget("text_area"), f"{IDEIAS[indice % len(IDEIAS)]} ({indice})")
+        await medir("passo1_temas", cliente.clicar("Gerar Sugestões Iniciais"))
+        await ler()
+        await medir("passo1_mais10", cliente.clicar("🔄 Gerar +10"))
+        await ler()
+        await escolher()
+        await medir("passo2_subtemas", cliente.clicar("Avançar para Aprofundamento"))
+        await ler()
+        await escolher()
+        await medir("passo3_problemas", cliente.clicar("Confirmar Subtema"))
+        await ler()
+        await escolher()
+        await medir("passo4_objetivos", cliente.clicar("Confirmar Problema"))
+        await ler()
+        for caixa in sorteio.sample(cliente.widgets("checkbox"), 3):
+            # Fora de um st.form, cada caixa marcada seria uma reexecução
+            await interagir(cliente.widget("checkbox", caixa.label), True)
+        await medir("passo5_referencial_estrategia", cliente.clicar("Confirmar Objetivos"))
+        if not cliente.tem_botao("Reiniciar Sistema"):
+            raise RuntimeError("o fluxo não chegou ao passo 6")
+        await ler()
+        await medir("passo6_exportacao", cliente.executar())
+    finally:
+        await cliente.fechar()
+    return medidas, reexecucoes
+
+
+async def executar_turma(url, args):
+    sorteio = random.Random(args.semente)
+    atrasos = [sorteio.uniform(0, args.chegada) for _ in range(args.sessoes)]
+    tarefas = [asyncio.create_task(sessao(i, url, args, atraso)) for i, atraso in enumerate(atrasos)]
+    concluidas = 0
+    for tarefa in asyncio.as_completed(tarefas):
+        try:
+            await tarefa
+        except Exception:
+            pass
+        concluidas += 1
+        print(f"{concluidas}/{args.sessoes} sessões encerradas", file=sys.stderr)
+    return [t.result() if t.exception() is None else t.exception() for t in tarefas]
+
+
+def imprimir(resultados, duracao, processo, servidor):
+    planos = [r[0] for r in resultados if isinstance(r, tuple)]
+    reexecucoes = [t for r in resultados if isinstance(r, tuple) for t in r[1]]
+    erros = [r for r in resultados if not isinstance(r, tuple)]
+    print(f"\nSessões: {len(resultados)} (concluídas {len(planos)}, com erro {len(erros)}) em {duracao:.1f}s")
+    print(f"Vazão: {len(planos) / duracao * 60:.1f} planos/minuto")
+    print(f"Chamadas ao modelo: {len(servidor.requisicoes)}")
+    if planos:
+        print(f"\n{'passo':<32}{'p50 (s)':>10}{'p90 (s)':>10}{'p99 (s)':>10}{'máx (s)':>10}")
+        for fase in FASES:
+            tempos = [p[fase] for p in planos]
+            print(f"{fase:<32}{percentil(tempos, 50):>10.2f}{percentil(tempos, 90):>10.2f}"
+                  f"{percentil(tempos, 99):>10.2f}{max(tempos):>10.2f}")
+        totais = [sum(p.values()) for p in planos]
+        print(f"{'espera total por plano':<32}{percentil(totais, 50):>10.2f}{percentil(totais, 90):>10.2f}"
+              f"{percentil(totais, 99):>10.2f}{max(totais):>10.2f}")
+    if reexecucoes:
+        print(f"{'reexecução por interação':<32}{percentil(reexecucoes, 50):>10.2f}{percentil(reexecucoes, 90):>10.2f}"
+              f"{percentil(reexecucoes, 99):>10.2f}{max(reexecucoes):>10.2f}")
+    if planos:
+        print(f"\nReexecuções por interação nos painéis: {len(reexecucoes) / len(planos):.1f} por plano")
+    if processo["rss_pico_mb"] is not None:
+        print(f"\nRSS do app: {processo['rss_inicial_mb']:.0f} MB no início, pico de {processo['rss_pico_mb']:.0f} MB")
+    if processo["threads_pico"] is not None:
+        print(f"Threads do app: mediana {processo['threads_p50']}, pico {processo['threads_pico']}")
+    for erro in erros[:5]:
+        print(f"erro: {type(erro).__name__}: {erro}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=40)
+    parser.add_argument("--chegada", type=float, default=60.0,
+                        help="janela (s) em que as sessões começam, espalhadas ao acaso")
+    parser.add_argument("--tempo-leitura", type=float, default=8.0,
+                        help="pausa média (s) antes de cada escolha; varia entre metade e 1,5 vez")
+    parser.add_argument("--latencia", type=float, default=1.0, help="segundos até o primeiro token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=60.0)
+    parser.add_argument("--timeout", type=float, default=600.0, help="prazo (s) de cada passo")
+    parser.add_argument("--com-cache", action="store_true",
+                        help="mantém o cache local de respostas (por padrão cada sessão paga suas chamadas)")
+    parser.add_argument("--max-reexecucao", type=float, default=None,
+                        help="limite (s) para o p90 da reexecução por interação; acima dele o teste falha")
+    parser.add_argument("--reexecucao-completa", action="store_true",
+                        help="reexecuta o script inteiro a cada interação, ignorando os st.fragment")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAIMock(RespostasGravadas(), latencia=args.latencia,
+                                  tokens_por_segundo=args.tokens_por_segundo).iniciar()
+    try:
+        with tempfile.TemporaryDirectory() as pasta_temp:
+            app, url = iniciar_app(servidor.url, pasta_temp, args.com_cache)
+            try:
+                with MonitorProcesso(app.pid) as monitor:
+                    inicio = time.perf_counter()
+                    resultados = asyncio.run(executar_turma(url, args))
+                    duracao = time.perf_counter() - inicio
+            finally:
+                app.terminate()
+                app.wait(10)
+    finally:
+        servidor.parar()
+
+    imprimir(resultados, duracao, monitor.resumo(), servidor)
+    falhou = any(not isinstance(r, tuple) for r in resultados)
+    reexecucoes = [t for r in resultados if isinstance(r, tuple) for t in r[1]]
+    if args.max_reexecucao is not None and reexecucoes and percentil(reexecucoes, 90) > args.max_reexecucao:
+        print(f"FALHA: p90 da reexecução por interação em {percentil(reexecucoes, 90):.2f}s"
+              f" (limite {args.max_reexecucao:.2f}s)", file=sys.stderr)
+        falhou = True
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
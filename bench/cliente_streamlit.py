@@ -0,0 +1,126 @@
+"""Cliente mínimo do protocolo WebSocket do Streamlit, no papel do navegador.
+
+Conecta em /_stcore/stream, pede execuções do script com o estado dos
+widgets e lê os elementos desenhados, o bastante para percorrer o app como
+um estudante: preencher campos, marcar opções e clicar em botões. Como o
+navegador, a mudança de um widget dentro de um st.fragment pede a
+reexecução só daquele fragmento.
+"""
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+# Fins de execução que encerram a interação (o fim "para rerun" é seguido de outra execução)
+FINS = {
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+}
+
+# Tipo de widget -> campo do WidgetState que guarda seu valor
+CAMPOS_VALOR = {
+    "text_input": "string_value",
+    "text_area": "string_value",
+    "radio": "string_value",
+    "selectbox": "string_value",
+    "checkbox": "bool_value",
+}
+
+
+class ErroApp(Exception):
+    """O script terminou com exceção ou st.error na tela."""
+
+
+class ClienteStreamlit:
+    def __init__(self, url_base):
+        self.url = url_base.rstrip("/").replace("http", "ws", 1) + "/_stcore/stream"
+        self.elementos = []
+        self.valores = {}
+        self._ws = None
+
+    async def conectar(self):
+        self._ws = await connect(self.url, subprotocols=["streamlit"], max_size=None)
+        await self.executar()
+        return self
+
+    async def fechar(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def executar(self, gatilho=None, fragmento=None):
+        """Roda o script com os valores atuais (e `gatilho` = id do botão clicado).
+
+        Com `fragmento`, roda só aquele st.fragment, como o navegador faz.
+        """
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        if fragmento:
+            msg.rerun_script.fragment_id = fragmento
+        for id_widget, (campo, valor) in self.valores.items():
+            estado = msg.rerun_script.widget_states.widgets.add()
+            estado.CopyFrom(WidgetState(id=id_widget, **{campo: valor}))
+        if gatilho:
+            msg.rerun_script.widget_states.widgets.add().CopyFrom(WidgetState(id=gatilho, trigger_value=True))
+        await self._ws.send(msg.SerializeToString())
+        await self._aguardar_fim()
+
+    async def _aguardar_fim(self):
+        while True:
+            resposta = ForwardMsg()
+            resposta.ParseFromString(await self._ws.recv())
+            tipo = resposta.WhichOneof("type")
+            if tipo == "new_session":
+                # Cada execução do script recomeça a tela do zero; a de um fragmento, só o fragmento
+                refeitos = set(resposta.new_session.fragment_ids_this_run)
+                self.elementos = [e for e in self.elementos if refeitos and e[2] not in refeitos]
+            elif tipo == "delta" and resposta.delta.WhichOneof("type") == "new_element":
+                elemento = resposta.delta.new_element
+                tipo_elemento = elemento.WhichOneof("type")
+                self.elementos.append((tipo_elemento, getattr(elemento, tipo_elemento), resposta.delta.fragment_id))
+            elif tipo == "script_finished" and resposta.script_finished in FINS:
+                break
+        for tipo_elemento, proto, _ in self.elementos:
+            if tipo_elemento == "exception":
+                raise ErroApp(f"{proto.type}: {proto.message}")
+            if tipo_elemento == "alert" and proto.format == proto.ERROR:
+                raise ErroApp(proto.body)
+
+    def widget(self, tipo, rotulo=""):
+        """Primeiro widget do `tipo` cujo rótulo começa com `rotulo`."""
+        for tipo_elemento, proto, _ in self.elementos:
+            if tipo_elemento == tipo and proto.label.startswith(rotulo):
+                return proto
+        raise LookupError(f"{tipo} '{rotulo}' não está na tela")
+
+    def widgets(self, tipo):
+        return [proto for tipo_elemento, proto, _ in self.elementos if tipo_elemento == tipo]
+
+    def tem_botao(self, rotulo):
+        return any(p.label.startswith(rotulo) for p in self.widgets("button"))
+
+    def preencher(self, proto, valor):
+        """Define o valor de um widget; vale a partir da próxima execução."""
+        tipo = next(t for t, p, _ in self.elementos if p is proto)
+        self.valores[proto.id] = (CAMPOS_VALOR[tipo], valor)
+
+    async def alterar(self, proto, valor, isolado=True):
+        """Muda o valor de um widget como um clique do estudante; devolve se houve reexecução.
+
+        Dentro de um st.form o valor só segue no envio do formulário, sem
+        reexecutar. Se o widget está num st.fragment, só o fragmento é
+        reexecutado; com `isolado=False` o script inteiro roda, como antes dos
+        fragmentos.
+        """
+        self.preencher(proto, valor)
+        if getattr(proto, "form_id", ""):
+            return False
+        fragmento = next(f for _, p, f in self.elementos if p is proto)
+        await self.executar(fragmento=fragmento if isolado else None)
+        return True
+
+    async def clicar(self, rotulo):
+        botao = self.widget("button", rotulo)
+        fragmento = next(f for _, p, f in self.elementos if p is botao)
+        await self.executar(gatilho=botao.id, fragmento=fragmento)
@@ -0,0 +1,153 @@
+"""Perfil da inicialização a frio do app: importações por pacote e tempo até a primeira tela.
+
+Cada repetição roda num processo Python novo, como um contêiner recém-criado:
+importa o Streamlit, executa a primeira renderização do app com o AppTest e
+usa `python -X importtime` para atribuir a cada pacote o tempo gasto
+importando os módulos que o script do app carregou. Também lista quais
+dependências pesadas já estavam carregadas na primeira tela (elas devem ficar
+para os passos que as usam: o SDK da OpenAI para as chamadas, fpdf/docx para
+a exportação).
+
+    python bench/perfil_inicializacao.py --repeticoes 5
+    python bench/perfil_inicializacao.py --max-primeira-tela 1.5 --json perfil.json
+
+Sai com código 1 se a primeira tela passar de --max-primeira-tela ou se algum
+módulo de --proibidos tiver sido carregado nela, para servir de teste.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado em cada processo novo; o stderr traz as linhas do -X importtime
+SONDA = r"""
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+importacao_streamlit = time.perf_counter() - inicio
+antes = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+inicio = time.perf_counter()
+at.run()
+primeira_tela = time.perf_counter() - inicio
+print(json.dumps({
+    "importacao_streamlit_s": importacao_streamlit,
+    "primeira_tela_s": primeira_tela,
+    "novos": sorted(set(sys.modules) - antes),
+    "erros": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def ler_importtime(texto):
+    """{módulo: tempo próprio em segundos} a partir da saída do -X importtime."""
+    tempos = {}
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, _, nome = linha[len("import time:"):].split("|")
+        tempos[nome.strip()] = int(proprio) / 1e6
+    return tempos
+
+
+def medir(app, ambiente):
+    """Uma inicialização a frio; devolve o resumo da sonda mais o tempo por pacote."""
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", SONDA, app],
+                              cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    total = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError(f"a sonda falhou:\n{processo.stderr[-2000:]}")
+    resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+    tempos = ler_importtime(processo.stderr)
+    pacotes = {}
+    # Só o que o script do app trouxe: o Streamlit e o AppTest já estavam carregados
+    for modulo in resultado.pop("novos"):
+        pacote = modulo.split(".")[0]
+        pacotes[pacote] = pacotes.get(pacote, 0.0) + tempos.get(modulo, 0.0)
+    resultado["processo_s"] = total
+    resultado["pacotes"] = pacotes
+    return resultado
+
+
+def resumir(medidas, proibidos):
+    pacotes = {}
+    for medida in medidas:
+        for pacote in medida["pacotes"]:
+            pacotes[pacote] = statistics.median(m["pacotes"].get(pacote, 0.0) for m in medidas)
+    carregados = sorted({p for m in medidas for p in m["pacotes"]} & set(proibidos))
+    return {
+        "repeticoes": len(medidas),
+        "processo_s": statistics.median(m["processo_s"] for m in medidas),
+        "importacao_streamlit_s": statistics.median(m["importacao_streamlit_s"] for m in medidas),
+        "primeira_tela_s": statistics.median(m["primeira_tela_s"] for m in medidas),
+        "importacoes_app_s": sum(pacotes.values()),
+        "pacotes": dict(sorted(pacotes.items(), key=lambda item: -item[1])),
+        "proibidos_carregados": carregados,
+        "erros": sorted({e for m in medidas for e in m["erros"]}),
+    }
+
+
+def imprimir(resumo, mostrar):
+    print(f"Inicialização a frio (mediana de {resumo['repeticoes']} processos)")
+    print(f"  processo completo:           {resumo['processo_s']:.2f}s")
+    print(f"  importar o Streamlit:        {resumo['importacao_streamlit_s']:.2f}s")
+    print(f"  primeira tela do app:        {resumo['primeira_tela_s']:.2f}s"
+          f" (importações do app: {resumo['importacoes_app_s']:.2f}s)")
+    print(f"\n{'pacote importado pelo app':<32}{'ms':>10}")
+    for pacote, segundos in list(resumo["pacotes"].items())[:mostrar]:
+        print(f"{pacote:<32}{segundos * 1000:>10.1f}")
+    if resumo["proibidos_carregados"]:
+        print(f"\nCarregados já na primeira tela: {', '.join(resumo['proibidos_carregados'])}")
+    for erro in resumo["erros"]:
+        print(f"erro no app: {erro}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--mostrar", type=int, default=12, help="quantos pacotes listar")
+    parser.add_argument("--proibidos", default="openai,httpx,fpdf,docx",
+                        help="pacotes que não devem ser carregados na primeira tela (separados por vírgula)")
+    parser.add_argument("--max-primeira-tela", type=float, default=None,
+                        help="limite (s) para a primeira tela; acima dele o script sai com erro")
+    parser.add_argument("--json", help="grava o resumo neste arquivo")
+    args = parser.parse_args()
+
+    proibidos = [p.strip() for p in args.proibidos.split(",") if p.strip()]
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        ambiente = dict(
+            os.environ,
+            OPENAI_API_KEY="perfil",
+            # Sem o aquecimento em segundo plano, que só começa depois da primeira tela
+            OPENAI_AQUECER="0",
+            CACHE_LLM_CAMINHO=os.path.join(pasta_temp, "respostas_llm.sqlite3"),
+            METRICAS_CAMINHO=os.path.join(pasta_temp, "metricas.sqlite3"),
+            SESSOES_CAMINHO=os.path.join(pasta_temp, "sessoes.sqlite3"),
+        )
+        medidas = [medir(args.app, ambiente) for _ in range(args.repeticoes)]
+    resumo = resumir(medidas, proibidos)
+    imprimir(resumo, args.mostrar)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+
+    falhas = list(resumo["erros"])
+    if resumo["proibidos_carregados"]:
+        falhas.append(f"pacotes carregados na primeira tela: {', '.join(resumo['proibidos_carregados'])}")
+    if args.max_primeira_tela is not None and resumo["primeira_tela_s"] > args.max_primeira_tela:
+        falhas.append(f"primeira tela em {resumo['primeira_tela_s']:.2f}s (limite {args.max_primeira_tela:.2f}s)")
+    for falha in falhas:
+        print(f"FALHA: {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
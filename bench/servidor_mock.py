@@ -0,0 +1,289 @@
+"""Servidor local compatível com a API da OpenAI, para medir o app sem rede.
+
+Responde /v1/chat/completions (com e sem streaming) repetindo respostas
+gravadas, com latência inicial e velocidade de geração configuráveis,
+/v1/models (usado no aquecimento da conexão) e, para o modo em lote,
+/v1/files e /v1/batches: cada lote fica pronto `latencia_lote` segundos
+depois de criado.
+
+Uso avulso:
+    python bench/servidor_mock.py --porta 8800 --latencia 0.5 --tokens-por-segundo 80
+e rode o app com OPENAI_BASE_URL=http://127.0.0.1:8800/v1.
+"""
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRAVACOES_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "respostas_gravadas.json")
+
+
+def contar_tokens(texto):
+    # Aproximação suficiente para simular tempo de geração (~4 caracteres por token)
+    return max(1, len(texto) // 4)
+
+
+class RespostasGravadas:
+    """Escolhe a resposta gravada pelo trecho característico do prompt de cada agente.
+
+    Agentes com várias gravações recebem uma de cada vez, em rodízio.
+    """
+
+    def __init__(self, caminho=GRAVACOES_PADRAO):
+        with open(caminho, encoding="utf-8") as f:
+            self.agentes = json.load(f)["agentes"]
+        self._rodizio = {a["agente"]: itertools.cycle(a["respostas"]) for a in self.agentes}
+        self._lock = threading.Lock()
+
+    def responder(self, texto_prompt):
+        for agente in self.agentes:
+            if any(trecho in texto_prompt for trecho in agente["contem"]):
+                with self._lock:
+                    resposta = next(self._rodizio[agente["agente"]])
+                if not isinstance(resposta, str):
+                    resposta = json.dumps(resposta, ensure_ascii=False)
+                return agente["agente"], resposta
+        return "desconhecido", "Resposta simulada."
+
+
+class ServidorOpenAIMock:
+    """Servidor em thread própria; `url` aponta para a base /v1."""
+
+    def __init__(self, respostas=None, porta=0, latencia=0.5, tokens_por_segundo=80.0, latencia_lote=2.0,
+                 prefixo_minimo_cache=1024):
+        self.respostas = respostas or RespostasGravadas()
+        self.latencia = latencia
+        self.tokens_por_segundo = tokens_por_segundo
+        self.latencia_lote = latencia_lote
+        self.prefixo_minimo_cache = prefixo_minimo_cache
+        self.requisicoes = []
+        self.prefixos = set()
+        self.arquivos = {}
+        self.lotes = {}
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), self._criar_handler())
+        self._http.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._http.server_address[1]}/v1"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def registrar(self, agente, duracao, tokens):
+        with self._lock:
+            self.requisicoes.append({"agente": agente, "duracao": duracao, "tokens": tokens})
+
+    def tempo_total(self):
+        with self._lock:
+            return sum(r["duracao"] for r in self.requisicoes)
+
+    def completar(self, corpo):
+        """Escolhe a resposta gravada para o pedido; devolve (agente, texto, uso)."""
+        mensagens = corpo.get("messages", [])
+        texto_prompt = "\n".join(str(m.get("content", "")) for m in mensagens)
+        agente, resposta = self.respostas.responder(texto_prompt)
+        tokens_prompt = contar_tokens(texto_prompt)
+        tokens_resposta = contar_tokens(resposta)
+        uso = {"prompt_tokens": tokens_prompt, "completion_tokens": tokens_resposta,
+               "total_tokens": tokens_prompt + tokens_resposta,
+               "prompt_tokens_details": {"cached_tokens": self._tokens_em_cache(mensagens)}}
+        return agente, resposta, uso
+
+    def _tokens_em_cache(self, mensagens):
+        # Como o cache de prompts da OpenAI: só a mensagem de sistema repetida conta como
+        # prefixo, a partir de `prefixo_minimo_cache` tokens e em blocos de 128
+        if not mensagens or mensagens[0].get("role") != "system":
+            return 0
+        prefixo = str(mensagens[0].get("content", ""))
+        with self._lock:
+            repetido = prefixo in self.prefixos
+            self.prefixos.add(prefixo)
+        tokens = contar_tokens(prefixo)
+        return tokens // 128 * 128 if repetido and tokens >= self.prefixo_minimo_cache else 0
+
+    def guardar_arquivo(self, conteudo, nome, finalidade):
+        arquivo = {"id": f"file-{uuid.uuid4().hex[:24]}", "object": "file", "bytes": len(conteudo),
+                   "created_at": int(time.time()), "filename": nome, "purpose": finalidade,
+                   "status": "processed"}
+        with self._lock:
+            self.arquivos[arquivo["id"]] = (arquivo, conteudo)
+        return arquivo
+
+    def criar_lote(self, corpo):
+        lote = {"id": f"batch_{uuid.uuid4().hex[:24]}", "object": "batch", "endpoint": corpo["endpoint"],
+                "completion_window": corpo.get("completion_window", "24h"), "status": "validating",
+                "created_at": int(time.time()), "input_file_id": corpo["input_file_id"],
+                "output_file_id": None, "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        with self._lock:
+            self.lotes[lote["id"]] = lote
+        threading.Thread(target=self._processar_lote, args=(lote,), daemon=True).start()
+        return lote
+
+    def _processar_lote(self, lote):
+        _, entrada = self.arquivos[lote["input_file_id"]]
+        pedidos = [json.loads(linha) for linha in entrada.decode("utf-8").splitlines() if linha.strip()]
+        with self._lock:
+            lote.update(status="in_progress", in_progress_at=int(time.time()))
+            lote["request_counts"]["total"] = len(pedidos)
+        time.sleep(self.latencia_lote)
+        saida = []
+        for pedido in pedidos:
+            agente, resposta, uso = self.completar(pedido["body"])
+            self.registrar(agente, 0.0, uso["completion_tokens"])
+            saida.append({"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": pedido["custom_id"],
+                          "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": {
+                              "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                              "model": pedido["body"].get("model", "mock"),
+                              "choices": [{"index": 0, "finish_reason": "stop",
+                                           "message": {"role": "assistant", "content": resposta}}],
+                              "usage": uso}},
+                          "error": None})
+        conteudo = "".join(json.dumps(linha, ensure_ascii=False) + "\n" for linha in saida).encode("utf-8")
+        arquivo = self.guardar_arquivo(conteudo, f"{lote['id']}_output.jsonl", "batch_output")
+        with self._lock:
+            lote.update(status="completed", completed_at=int(time.time()), output_file_id=arquivo["id"])
+            lote["request_counts"]["completed"] = len(saida)
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, corpo):
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                caminho = self.path.split("?")[0].rstrip("/")
+                partes = caminho.split("/")
+                if caminho.endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "mock", "object": "model",
+                                                                 "created": 0, "owned_by": "bench"}]})
+                elif "batches" in partes and partes[-1] in servidor.lotes:
+                    with servidor._lock:
+                        self._json(200, dict(servidor.lotes[partes[-1]]))
+                elif caminho.endswith("/content") and partes[-2] in servidor.arquivos:
+                    conteudo = servidor.arquivos[partes[-2]][1]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(conteudo)))
+                    self.end_headers()
+                    self.wfile.write(conteudo)
+                else:
+                    self._json(404, {"error": {"message": "não encontrado"}})
+
+            def _upload(self, dados):
+                # multipart/form-data com os campos "purpose" e "file"
+                mensagem = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + dados)
+                campos = {parte.get_param("name", header="content-disposition"): parte
+                          for parte in mensagem.iter_parts()}
+                arquivo = campos["file"]
+                self._json(200, servidor.guardar_arquivo(arquivo.get_payload(decode=True),
+                                                         arquivo.get_filename() or "upload.jsonl",
+                                                         campos["purpose"].get_content().strip()))
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length", 0))
+                dados = self.rfile.read(tamanho)
+                caminho = self.path.split("?")[0].rstrip("/")
+                if caminho.endswith("/files"):
+                    self._upload(dados)
+                    return
+                corpo = json.loads(dados or b"{}")
+                if caminho.endswith("/batches"):
+                    self._json(200, servidor.criar_lote(corpo))
+                    return
+                if not caminho.endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "não encontrado"}})
+                    return
+                inicio = time.monotonic()
+                agente, resposta, uso = servidor.completar(corpo)
+                tokens_resposta = uso["completion_tokens"]
+                time.sleep(servidor.latencia)
+                if corpo.get("stream"):
+                    self._stream(corpo, resposta, uso)
+                else:
+                    time.sleep(tokens_resposta / servidor.tokens_por_segundo)
+                    self._json(200, {
+                        "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                        "model": corpo.get("model", "mock"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": resposta}}],
+                        "usage": uso,
+                    })
+                servidor.registrar(agente, time.monotonic() - inicio, tokens_resposta)
+
+            def _stream(self, corpo, resposta, uso):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": corpo.get("model", "mock")}
+                # Um pedaço a cada ~4 tokens, no ritmo configurado
+                passo = 16
+                for i in range(0, len(resposta), passo):
+                    trecho = resposta[i:i + passo]
+                    pedaco = dict(base, choices=[{"index": 0, "delta": {"content": trecho},
+                                                  "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(pedaco)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(contar_tokens(trecho) / servidor.tokens_por_segundo)
+                fim = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                self.wfile.write(f"data: {json.dumps(fim)}\n\n".encode("utf-8"))
+                if (corpo.get("stream_options") or {}).get("include_usage"):
+                    self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=uso))}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8800)
+    parser.add_argument("--latencia", type=float, default=0.5, help="segundos até o primeiro token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=80.0)
+    parser.add_argument("--latencia-lote", type=float, default=2.0, help="segundos até um lote ficar pronto")
+    parser.add_argument("--prefixo-minimo-cache", type=int, default=1024,
+                        help="tokens mínimos da mensagem de sistema para o cache de prompts simulado")
+    parser.add_argument("--gravacoes", default=GRAVACOES_PADRAO)
+    args = parser.parse_args()
+    servidor = ServidorOpenAIMock(RespostasGravadas(args.gravacoes), porta=args.porta,
+                                  latencia=args.latencia, tokens_por_segundo=args.tokens_por_segundo,
+                                  latencia_lote=args.latencia_lote, prefixo_minimo_cache=args.prefixo_minimo_cache)
+    print(f"Servidor simulado em {servidor.url}")
+    try:
+        servidor._http.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
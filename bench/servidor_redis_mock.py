@@ -0,0 +1,180 @@
+"""Servidor local que fala o protocolo do Redis (RESP), para testar os backends compartilhados sem um Redis.
+
+Guarda tudo em memória e implementa só os comandos que o cache e o armazém
+de sessões usam (GET, SET com EX/PX, DEL, SCAN...), com expiração. Conta as
+conexões abertas e os comandos recebidos, para conferir o pool de conexões.
+
+Uso avulso:
+    python bench/servidor_redis_mock.py --porta 6380
+e rode o app com CACHE_LLM_BACKEND=redis SESSOES_BACKEND=redis REDIS_URL=redis://127.0.0.1:6380/0.
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class ErroComando(Exception):
+    pass
+
+
+class ServidorRedisMock:
+    """Servidor em thread própria; `url` é a URL redis:// para o cliente."""
+
+    def __init__(self, porta=0, latencia=0.0):
+        self.latencia = latencia
+        self.dados = {}
+        self.conexoes = 0
+        self.comandos = 0
+        self._lock = threading.Lock()
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", porta), self._criar_handler())
+        self._tcp.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self._tcp.server_address[1]}/0"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._tcp.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._tcp.shutdown()
+        self._tcp.server_close()
+
+    def _vivo(self, chave, agora):
+        item = self.dados.get(chave)
+        if item is not None and item[1] is not None and item[1] <= agora:
+            del self.dados[chave]
+            return None
+        return item
+
+    def executar(self, argumentos):
+        """Executa um comando já decodificado; devolve a resposta em Python (bytes, int, list, None, str)."""
+        nome = argumentos[0].decode().upper()
+        args = argumentos[1:]
+        agora = time.monotonic()
+        with self._lock:
+            self.comandos += 1
+            if nome == "PING":
+                return "PONG"
+            if nome in ("CLIENT", "SELECT"):
+                return "OK"
+            if nome == "GET":
+                item = self._vivo(args[0], agora)
+                return None if item is None else item[0]
+            if nome == "SET":
+                expira = None
+                opcoes = [a.decode().upper() for a in args[2:]]
+                for indice, opcao in enumerate(opcoes):
+                    if opcao == "EX":
+                        expira = agora + float(opcoes[indice + 1])
+                    elif opcao == "PX":
+                        expira = agora + float(opcoes[indice + 1]) / 1000
+                existe = self._vivo(args[0], agora) is not None
+                if ("NX" in opcoes and existe) or ("XX" in opcoes and not existe):
+                    return None
+                self.dados[args[0]] = (args[1], expira)
+                return "OK"
+            if nome in ("DEL", "UNLINK"):
+                return sum(self.dados.pop(chave, None) is not None for chave in args)
+            if nome == "EXISTS":
+                return sum(self._vivo(chave, agora) is not None for chave in args)
+            if nome == "EXPIRE":
+                item = self._vivo(args[0], agora)
+                if item is None:
+                    return 0
+                self.dados[args[0]] = (item[0], agora + float(args[1]))
+                return 1
+            if nome == "TTL":
+                item = self._vivo(args[0], agora)
+                if item is None:
+                    return -2
+                return -1 if item[1] is None else int(item[1] - agora)
+            if nome == "SCAN":
+                # Devolve tudo de uma vez (cursor 0), filtrando por MATCH
+                padrao = "*"
+                opcoes = [a.decode() for a in args[1:]]
+                for indice, opcao in enumerate(opcoes):
+                    if opcao.upper() == "MATCH":
+                        padrao = opcoes[indice + 1]
+                chaves = [c for c in list(self.dados) if self._vivo(c, agora) is not None
+                          and fnmatch.fnmatchcase(c.decode("utf-8", "replace"), padrao)]
+                return [b"0", chaves]
+            if nome == "DBSIZE":
+                return len(self.dados)
+            if nome in ("FLUSHDB", "FLUSHALL"):
+                self.dados.clear()
+                return "OK"
+        raise ErroComando(f"ERR unknown command '{nome}'")
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with servidor._lock:
+                    servidor.conexoes += 1
+                while True:
+                    try:
+                        argumentos = self._ler_comando()
+                    except (ConnectionError, ValueError):
+                        return
+                    if argumentos is None:
+                        return
+                    if servidor.latencia:
+                        time.sleep(servidor.latencia)
+                    try:
+                        resposta = servidor.executar(argumentos)
+                    except (ErroComando, IndexError, ValueError) as e:
+                        resposta = e if isinstance(e, ErroComando) else ErroComando("ERR syntax error")
+                    self.wfile.write(self._codificar(resposta))
+                    self.wfile.flush()
+
+            def _ler_comando(self):
+                linha = self.rfile.readline()
+                if not linha:
+                    return None
+                if not linha.startswith(b"*"):
+                    # Comando "inline", como os do redis-cli via telnet
+                    return linha.split()
+                argumentos = []
+                for _ in range(int(linha[1:])):
+                    tamanho = int(self.rfile.readline()[1:])
+                    argumentos.append(self.rfile.read(tamanho + 2)[:-2])
+                return argumentos
+
+            def _codificar(self, valor):
+                if isinstance(valor, ErroComando):
+                    return f"-{valor}\r\n".encode()
+                if valor is None:
+                    return b"$-1\r\n"
+                if isinstance(valor, str):
+                    return f"+{valor}\r\n".encode()
+                if isinstance(valor, int):
+                    return f":{valor}\r\n".encode()
+                if isinstance(valor, list):
+                    return f"*{len(valor)}\r\n".encode() + b"".join(self._codificar(v) for v in valor)
+                return b"$%d\r\n%s\r\n" % (len(valor), valor)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=6380)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de espera por comando (rede simulada)")
+    args = parser.parse_args()
+    servidor = ServidorRedisMock(porta=args.porta, latencia=args.latencia)
+    print(f"Servidor Redis simulado em {servidor.url}")
+    try:
+        servidor._tcp.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
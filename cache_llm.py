@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from conexao_redis import cliente_redis, prefixo_redis
+
+CAMINHO_PADRAO = ".cache/respostas_llm.sqlite3"
+
+
+def chave_cache(modelo, prompt):
+    """Chave do cache: hash do modelo + prompt (texto ou par sistema/usuário)."""
+    if not isinstance(prompt, str):
+        prompt = "\0".join(prompt)
+    return hashlib.sha256(f"{modelo}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache em disco (SQLite) das respostas do modelo.
+
+    Entradas expiram após `ttl_horas` e, quando o arquivo passa de `max_mb`,
+    as entradas usadas há mais tempo são descartadas (LRU).
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO, ttl_horas=168, max_mb=200):
+        self.caminho = caminho
+        self.ttl = ttl_horas * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS respostas (
+                               chave TEXT PRIMARY KEY,
+                               resposta TEXT NOT NULL,
+                               tamanho INTEGER NOT NULL,
+                               criado REAL NOT NULL,
+                               acessado REAL NOT NULL)""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_acessado ON respostas (acessado)")
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação: as sessões do Streamlit rodam em threads diferentes
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def obter(self, modelo, prompt):
+        """Devolve a resposta guardada ou None se não existir ou tiver expirado."""
+        chave = chave_cache(modelo, prompt)
+        agora = time.time()
+        with self._lock, self._conectar() as con:
+            linha = con.execute("SELECT resposta, criado FROM respostas WHERE chave = ?",
+                                (chave,)).fetchone()
+            if linha is None:
+                return None
+            resposta, criado = linha
+            if agora - criado > self.ttl:
+                con.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                return None
+            con.execute("UPDATE respostas SET acessado = ? WHERE chave = ?", (agora, chave))
+            return resposta
+
+    def guardar(self, modelo, prompt, resposta):
+        chave = chave_cache(modelo, prompt)
+        agora = time.time()
+        tamanho = len(resposta.encode("utf-8")) + len(chave)
+        with self._lock, self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?)",
+                        (chave, resposta, tamanho, agora, agora))
+            self._limitar_tamanho(con, agora)
+
+    def _limitar_tamanho(self, con, agora):
+        con.execute("DELETE FROM respostas WHERE criado < ?", (agora - self.ttl,))
+        total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Remove as entradas menos usadas recentemente até caber no limite
+        excesso = total - self.max_bytes
+        removidas = []
+        for chave, tamanho in con.execute("SELECT chave, tamanho FROM respostas ORDER BY acessado"):
+            removidas.append((chave,))
+            excesso -= tamanho
+            if excesso <= 0:
+                break
+        con.executemany("DELETE FROM respostas WHERE chave = ?", removidas)
+
+    def limpar(self):
+        with self._lock, self._conectar() as con:
+            con.execute("DELETE FROM respostas")
+
+
+class CacheRespostasRedis:
+    """Cache das respostas num servidor Redis, compartilhado por todas as réplicas do app.
+
+    As respostas vão comprimidas (zlib) e expiram após `ttl_horas`; o limite
+    de tamanho fica com o servidor (maxmemory com a política allkeys-lru).
+    Uma falha de conexão conta como ausência no cache: o app segue chamando
+    o modelo em vez de parar.
+    """
+
+    def __init__(self, cliente, prefixo="orientador", ttl_horas=168):
+        self.cliente = cliente
+        self.prefixo = f"{prefixo}:llm:"
+        self.ttl = int(ttl_horas * 3600)
+
+    def obter(self, modelo, prompt):
+        import redis
+
+        try:
+            dados = self.cliente.get(self.prefixo + chave_cache(modelo, prompt))
+        except redis.RedisError:
+            return None
+        return None if dados is None else zlib.decompress(dados).decode("utf-8")
+
+    def guardar(self, modelo, prompt, resposta):
+        import redis
+
+        try:
+            self.cliente.set(self.prefixo + chave_cache(modelo, prompt),
+                             zlib.compress(resposta.encode("utf-8"), 6), ex=self.ttl)
+        except redis.RedisError:
+            pass
+
+    def limpar(self):
+        chaves = list(self.cliente.scan_iter(match=self.prefixo + "*", count=500))
+        for inicio in range(0, len(chaves), 500):
+            self.cliente.delete(*chaves[inicio:inicio + 500])
+
+
+# Backends disponíveis em CACHE_LLM_BACKEND
+BACKENDS = {
+    "sqlite": lambda ttl_horas, max_mb: CacheRespostas(os.getenv("CACHE_LLM_CAMINHO", CAMINHO_PADRAO),
+                                                       ttl_horas, max_mb),
+    "redis": lambda ttl_horas, max_mb: CacheRespostasRedis(cliente_redis(), prefixo_redis(), ttl_horas),
+}
+
+_cache_padrao = None
+_cache_lock = threading.Lock()
+
+
+def cache_padrao():
+    """Instância única do cache por processo, escolhida por CACHE_LLM_BACKEND (padrão: sqlite)."""
+    global _cache_padrao
+    with _cache_lock:
+        if _cache_padrao is None:
+            backend = os.getenv("CACHE_LLM_BACKEND", "sqlite")
+            if backend not in BACKENDS:
+                raise ValueError(f"CACHE_LLM_BACKEND desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+            _cache_padrao = BACKENDS[backend](
+                float(os.getenv("CACHE_LLM_TTL_HORAS", "168")),
+                float(os.getenv("CACHE_LLM_MAX_MB", "200")),
+            )
+        return _cache_padrao
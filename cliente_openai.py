@@ -0,0 +1,72 @@
+import os
+import threading
+
+_cliente = None
+_cliente_lock = threading.Lock()
+_preparacao = None
+
+
+def _http2_disponivel():
+    # HTTP/2 exige o pacote opcional "h2" (pip install "httpx[http2]")
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def criar_cliente():
+    """Cria um cliente OpenAI com pool de conexões configurável pelo .env."""
+    # O SDK (e o httpx) só é carregado aqui, fora do caminho da primeira tela
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    limites = httpx.Limits(
+        max_connections=int(os.getenv("OPENAI_MAX_CONEXOES", "100")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_CONEXOES_OCIOSAS", "20")),
+        # Mantém as conexões abertas entre os passos para não repetir o handshake TLS
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_SEGUNDOS", "300")),
+    )
+    http2 = os.getenv("OPENAI_HTTP2", "1") == "1" and _http2_disponivel()
+    http_client = DefaultHttpxClient(limits=limites, http2=http2)
+    # As retentativas ficam a cargo de resiliencia.chamar_com_resiliencia
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+
+
+def aquecer_conexao(cliente):
+    """Abre a conexão com a API antes da primeira chamada dos agentes."""
+    try:
+        cliente.with_options(timeout=10, max_retries=0).models.list()
+    except Exception:
+        # O aquecimento é só uma otimização: falhas aqui não afetam o app
+        pass
+
+
+def obter_cliente():
+    """Cliente único por processo, compartilhado entre sessões e reruns do Streamlit.
+
+    Na primeira chamada a conexão é aquecida em segundo plano (desative com
+    OPENAI_AQUECER=0).
+    """
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = criar_cliente()
+            if os.getenv("OPENAI_AQUECER", "1") == "1":
+                threading.Thread(target=aquecer_conexao, args=(_cliente,), daemon=True).start()
+        return _cliente
+
+
+def preparar_em_segundo_plano():
+    """Cria o cliente (e aquece a conexão) numa thread, sem atrasar a primeira tela.
+
+    O app chama depois de desenhar a página; só age uma vez por processo e
+    respeita OPENAI_AQUECER=0 (o cliente é então criado na primeira chamada).
+    """
+    global _preparacao
+    if os.getenv("OPENAI_AQUECER", "1") != "1":
+        return
+    with _cliente_lock:
+        if _preparacao is None and _cliente is None:
+            _preparacao = threading.Thread(target=obter_cliente, daemon=True)
+            _preparacao.start()
@@ -0,0 +1,116 @@
+import contextvars
+import threading
+from concurrent.futures import Future
+
+
+class TransmissaoCompartilhada:
+    """Trechos de uma resposta em streaming, lidos por quantos consumidores se juntarem a ela.
+
+    Quem chega no meio recebe primeiro os trechos já gerados e depois acompanha
+    o restante em tempo real; uma falha chega a todos no mesmo ponto.
+    """
+
+    def __init__(self):
+        self.trechos = []
+        self.erro = None
+        self.terminada = False
+        self._condicao = threading.Condition()
+
+    def alimentar(self, gerador):
+        try:
+            for trecho in gerador:
+                with self._condicao:
+                    self.trechos.append(trecho)
+                    self._condicao.notify_all()
+        except Exception as e:
+            self.erro = e
+        finally:
+            with self._condicao:
+                self.terminada = True
+                self._condicao.notify_all()
+
+    def ler(self):
+        lidos = 0
+        while True:
+            with self._condicao:
+                while lidos >= len(self.trechos) and not self.terminada:
+                    self._condicao.wait(1.0)
+                novos = self.trechos[lidos:]
+                fim = self.terminada and lidos + len(novos) >= len(self.trechos)
+            yield from novos
+            lidos += len(novos)
+            if fim:
+                if self.erro is not None:
+                    raise self.erro
+                return
+
+
+class Coalescedor:
+    """Junta chamadas idênticas em andamento ("single flight").
+
+    Enquanto a primeira chamada de uma chave não termina, as seguintes com a
+    mesma chave esperam por ela e recebem o mesmo resultado (ou o mesmo erro),
+    em vez de repetir a requisição ao modelo.
+    """
+
+    def __init__(self):
+        self._em_andamento = {}
+        self._transmissoes = {}
+        self._lock = threading.Lock()
+
+    def executar(self, chave, funcao):
+        """Executa `funcao()` uma só vez entre as chamadas simultâneas; devolve (resultado, compartilhado)."""
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            primeira = futuro is None
+            if primeira:
+                futuro = self._em_andamento[chave] = Future()
+        if not primeira:
+            return futuro.result(), True
+        try:
+            resultado = funcao()
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+        futuro.set_result(resultado)
+        return resultado, False
+
+    def transmitir(self, chave, criar_gerador):
+        """Transmissão compartilhada da chave; devolve (transmissão, compartilhada).
+
+        A primeira chamada consome `criar_gerador()` numa thread própria (com o
+        contexto de quem chamou), para que a geração siga até o fim mesmo se
+        esse consumidor desistir; as demais só se juntam à leitura.
+        """
+        with self._lock:
+            transmissao = self._transmissoes.get(chave)
+            if transmissao is not None:
+                return transmissao, True
+            transmissao = self._transmissoes[chave] = TransmissaoCompartilhada()
+
+        def bombear():
+            try:
+                transmissao.alimentar(criar_gerador())
+            finally:
+                with self._lock:
+                    self._transmissoes.pop(chave, None)
+
+        contexto = contextvars.copy_context()
+        threading.Thread(target=contexto.run, args=(bombear,), daemon=True).start()
+        return transmissao, False
+
+
+_coalescedor = None
+_coalescedor_lock = threading.Lock()
+
+
+def coalescedor_padrao():
+    """Instância única por processo, compartilhada por todas as sessões."""
+    global _coalescedor
+    with _coalescedor_lock:
+        if _coalescedor is None:
+            _coalescedor = Coalescedor()
+        return _coalescedor
@@ -0,0 +1,49 @@
+import os
+import threading
+
+URL_PADRAO = "redis://127.0.0.1:6379/0"
+
+
+def criar_cliente_redis(url=URL_PADRAO, max_conexoes=50, timeout=5.0):
+    """Cliente Redis com um pool de conexões compartilhado pelas threads do processo.
+
+    O pacote `redis` é opcional: só é preciso instalá-lo (pip install redis)
+    quando algum backend compartilhado usa Redis. Serve qualquer servidor que
+    fale o protocolo do Redis (Redis, Valkey, KeyDB, o bench/servidor_redis_mock.py).
+    """
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError("O backend redis precisa do pacote redis: pip install redis") from e
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=max_conexoes,
+        # Com o pool esgotado a thread espera uma conexão livre em vez de abrir outra
+        timeout=timeout,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+        health_check_interval=30,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def cliente_redis():
+    """Cliente único por processo (cache e sessões dividem o mesmo pool), configurado por REDIS_URL."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = criar_cliente_redis(
+                os.getenv("REDIS_URL", URL_PADRAO),
+                max_conexoes=int(os.getenv("REDIS_MAX_CONEXOES", "50")),
+                timeout=float(os.getenv("REDIS_TIMEOUT", "5")),
+            )
+        return _cliente
+
+
+def prefixo_redis():
+    """Prefixo das chaves, para várias instalações dividirem o mesmo servidor."""
+    return os.getenv("REDIS_PREFIXO", "orientador")
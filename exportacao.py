@@ -0,0 +1,99 @@
+import hashlib
+import json
+from datetime import datetime
+
+
+def assinatura_plano(dados):
+    """Hash do conteúdo do plano; chave dos documentos exportados (muda só se o plano mudar)."""
+    return hashlib.sha256(json.dumps(dados, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def numerar_objetivos(objetivos_brutos):
+    """Renumera os objetivos ("1. ...\\n2. ...") em ordem progressiva."""
+    lista_objetivos = [obj.split('.', 1)[-1].strip() for obj in objetivos_brutos.split('\n') if obj.strip()]
+    return "".join(f"{idx}. {obj}\n" for idx, obj in enumerate(lista_objetivos, 1))
+
+
+def gerar_conteudo_markdown(dados, gerado_em=None):
+    """Plano de trabalho completo em Markdown a partir dos `dados` da sessão."""
+    gerado_em = gerado_em or datetime.now()
+    # Resgatando os dados exatos salvos no Agente 1
+    area_user = dados.get('area_usuario', 'Não informada')
+    ideia_user = dados.get('ideia_usuario', 'Não informada')
+
+    return f"""# Plano de Trabalho Acadêmico
+---
+**Data de Geração:** {gerado_em.strftime('%d/%m/%Y %H:%M')}
+
+**Área informada:** {area_user}  
+**Ideia original digitada pelo usuário:** {ideia_user}
+
+---
+
+## 1. Tema Principal
+{dados.get('tema_base', 'Não definido')}
+
+## 2. Subtema / Recorte Específico
+{dados.get('tema_escolhido', 'Mesmo que o tema principal')}
+
+## 3. Problema de Pesquisa
+{dados.get('problema_pesquisa', 'Não definido')}
+
+## 4. Objetivos Específicos
+{numerar_objetivos(dados.get('objetivos', ''))}
+
+## 5. Referencial Teórico (Autores e Obras)
+{dados.get('ref_classicas', 'Não gerado')}
+
+## 6. Estratégia de Busca (Metodologia)
+{dados.get('ref_atuais', 'Não gerada')}
+
+---
+*Gerado pelo Sistema de IA para Monografia*
+"""
+
+
+def _texto_pdf(conteudo):
+    """Remove a marcação Markdown que a fonte padrão do PDF não representa."""
+    linhas = []
+    for linha in str(conteudo).replace('###', '').replace('**', '').replace('`', '').split('\n'):
+        if '---' in linha and '|' in linha:
+            continue
+        linhas.append(linha.replace('|', '  '))
+    return '\n'.join(linhas).encode('latin-1', 'replace').decode('latin-1')
+
+
+def criar_pdf(dados):
+    """Plano de trabalho em PDF (bytes). Requer o pacote fpdf."""
+    from fpdf import FPDF
+
+    secoes = [
+        ('Tema Principal', dados.get('tema_base', '')),
+        ('Subtema / Recorte Específico', dados.get('tema_escolhido', '')),
+        ('Problema de Pesquisa', dados.get('problema_pesquisa', '')),
+        ('Objetivos Específicos', numerar_objetivos(dados.get('objetivos', ''))),
+        ('Referencial Teórico (Autores e Obras)', dados.get('ref_classicas', '')),
+        ('Estratégia de Busca (DeCS/MeSH)', dados.get('ref_atuais', '')),
+    ]
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    pdf.set_font("helvetica", 'B', 18)
+    pdf.cell(0, 15, "Plano de Trabalho Academico", ln=True, align='C')
+    pdf.line(10, 25, 200, 25)
+    pdf.ln(10)
+
+    for label, conteudo in secoes:
+        pdf.set_fill_color(240, 240, 240)
+        pdf.set_font("helvetica", 'B', 12)
+        pdf.cell(0, 10, _texto_pdf(label), ln=True, fill=True)
+        pdf.ln(3)
+        pdf.set_font("helvetica", size=10)
+        # Uma única célula por seção: o fpdf quebra as linhas sozinho
+        pdf.multi_cell(0, 6, _texto_pdf(conteudo))
+        pdf.ln(5)
+
+    # fpdf 1.x devolve str (latin-1) com dest="S"; o fpdf2 devolve bytearray
+    saida = pdf.output(dest="S")
+    return saida.encode('latin-1') if isinstance(saida, str) else bytes(saida)
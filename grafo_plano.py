@@ -0,0 +1,116 @@
+import hashlib
+import json
+
+# Nós do plano em ordem topológica: nome -> (tipo, entradas)
+# - "gerado": produzido por um agente a partir das entradas (memorizado por elas)
+# - "escolha": decidido pelo estudante a partir das entradas; sai do plano se elas mudarem
+# Entradas que não são nós (área, ideia) são dados informados pelo estudante.
+NOS_PLANO = {
+    "tema_base": ("escolha", ("area_usuario", "ideia_usuario")),
+    "subtemas_lista": ("gerado", ("area_usuario", "tema_base")),
+    "tema_escolhido": ("escolha", ("area_usuario", "tema_base")),
+    "probs_lista": ("gerado", ("tema_escolhido",)),
+    "problema_pesquisa": ("escolha", ("tema_escolhido",)),
+    "lista_objs": ("gerado", ("tema_escolhido", "problema_pesquisa")),
+    "objetivos": ("escolha", ("tema_escolhido", "problema_pesquisa")),
+    # Os prompts dos Agentes 5 e 6 não usam o problema nem os objetivos
+    "ref_classicas": ("gerado", ("area_usuario", "tema_escolhido")),
+    "ref_atuais": ("gerado", ("tema_escolhido",)),
+}
+
+
+class GrafoDependencias:
+    """Cadeia de agentes como um grafo de dependências com nós memorizados.
+
+    Os valores ficam em `dados` (o plano) e o controle do grafo num dict à
+    parte, `controle`, que pode ser salvo com a sessão: a "origem" de cada nó
+    (assinatura das entradas com que foi produzido) e a "memoria" dos valores
+    gerados, indexados pela assinatura.
+
+    Quando uma escolha muda, só os nós que dependem dela, direta ou
+    indiretamente, saem do plano: os gerados vão para a memória e voltam sem
+    nova chamada se as entradas voltarem a ser as mesmas; as escolhas são
+    descartadas. Os demais nós ficam como estão.
+    """
+
+    def __init__(self, nos, max_memoria=4):
+        definidos = set()
+        for nome, (tipo, entradas) in nos.items():
+            if tipo not in ("gerado", "escolha"):
+                raise ValueError(f"nó {nome}: tipo desconhecido: {tipo}")
+            for entrada in entradas:
+                if entrada in nos and entrada not in definidos:
+                    raise ValueError(f"nó {nome} depende de {entrada}, que vem depois na ordem")
+            definidos.add(nome)
+        self.nos = nos
+        self.max_memoria = max_memoria
+
+    def assinatura(self, dados, nome):
+        entradas = {entrada: dados.get(entrada) for entrada in self.nos[nome][1]}
+        texto = json.dumps(entradas, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+    def alterar(self, dados, controle, **valores):
+        """Grava as escolhas em `valores` (None remove) e descarta o que dependia das anteriores.
+
+        Devolve os nomes dos nós que saíram do plano.
+        """
+        origem = controle.setdefault("origem", {})
+        for nome, valor in valores.items():
+            if valor is None:
+                dados.pop(nome, None)
+            else:
+                dados[nome] = valor
+        for nome in valores:
+            if nome in self.nos and nome in dados:
+                origem[nome] = self.assinatura(dados, nome)
+        return self.propagar(dados, controle)
+
+    def propagar(self, dados, controle):
+        """Tira do plano os nós cujas entradas mudaram ou faltam; devolve seus nomes."""
+        origem = controle.setdefault("origem", {})
+        descartados = []
+        for nome, (tipo, entradas) in self.nos.items():
+            if nome not in dados:
+                origem.pop(nome, None)
+                continue
+            atual = self.assinatura(dados, nome)
+            if all(entrada in dados for entrada in entradas):
+                if nome not in origem:
+                    # Plano salvo antes do grafo: assume que o valor veio das entradas atuais
+                    origem[nome] = atual
+                if origem[nome] == atual:
+                    continue
+            if tipo == "gerado" and nome in origem:
+                self._memorizar(controle, nome, origem[nome], dados[nome])
+            del dados[nome]
+            origem.pop(nome, None)
+            descartados.append(nome)
+        return descartados
+
+    def disponivel(self, dados, controle, nome):
+        """Se o nó já tem valor, no plano ou na memória, para as entradas em `dados`."""
+        assinatura = self.assinatura(dados, nome)
+        if nome in dados and controle.get("origem", {}).get(nome) == assinatura:
+            return True
+        return assinatura in controle.get("memoria", {}).get(nome, {})
+
+    def memorizado(self, dados, controle, nome):
+        """Valor já gerado para as entradas atuais do nó, ou None."""
+        return controle.get("memoria", {}).get(nome, {}).get(self.assinatura(dados, nome))
+
+    def registrar(self, dados, controle, nome, valor):
+        """Grava o valor gerado (ou escolhido) para as entradas atuais do nó."""
+        dados[nome] = valor
+        controle.setdefault("origem", {})[nome] = self.assinatura(dados, nome)
+
+    def _memorizar(self, controle, nome, assinatura, valor):
+        memoria = controle.setdefault("memoria", {}).setdefault(nome, {})
+        memoria.pop(assinatura, None)
+        memoria[assinatura] = valor
+        # Só as últimas versões de cada nó: a memória vai junto com a sessão salva
+        while len(memoria) > self.max_memoria:
+            del memoria[next(iter(memoria))]
+
+
+GRAFO_PLANO = GrafoDependencias(NOS_PLANO)
@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from metricas import sessao_atual
+from resiliencia import ErroLimiteRequisicoes
+
+
+class ErroFilaCheia(ErroLimiteRequisicoes):
+    mensagem = "Muitos colegas usando o sistema agora e a fila está longa. Tente novamente em um minuto."
+
+
+def estimar_tokens(texto):
+    # Aproximação usada só para reservar capacidade (~4 caracteres por token)
+    return len(texto) // 4 + 1
+
+
+class BaldeFichas:
+    """Token bucket: até `por_minuto` fichas, repostas continuamente ao longo do minuto."""
+
+    def __init__(self, por_minuto):
+        self.capacidade = por_minuto
+        self.taxa = por_minuto / 60
+        self.disponivel = float(por_minuto)
+        self._atualizado = time.monotonic()
+
+    def _repor(self, agora):
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def espera(self, quantidade, agora):
+        """Segundos até haver `quantidade` fichas (0 se já houver)."""
+        self._repor(agora)
+        falta = min(quantidade, self.capacidade) - self.disponivel
+        return max(0.0, falta / self.taxa)
+
+    def consumir(self, quantidade):
+        self.disponivel -= min(quantidade, self.capacidade)
+
+
+class LimitadorTaxa:
+    """Limite de requisições e de tokens por minuto para o processo inteiro.
+
+    Todas as sessões do Streamlit passam pelo mesmo limitador antes de cada
+    chamada ao modelo. Quem não cabe nos limites espera numa fila ordenada por
+    prioridade (menor primeiro) e, na mesma prioridade, por ordem de chegada;
+    só o primeiro da fila é atendido, para que uma chamada grande não seja
+    ultrapassada indefinidamente pelas pequenas. Com a fila em `max_fila` ou
+    após `espera_max` segundos esperando, levanta ErroFilaCheia.
+    """
+
+    def __init__(self, rpm, tpm, max_fila=200, espera_max=120):
+        self.baldes = [(BaldeFichas(rpm), lambda tokens: 1)] if rpm else []
+        if tpm:
+            self.baldes.append((BaldeFichas(tpm), lambda tokens: tokens))
+        self.max_fila = max_fila
+        self.espera_max = espera_max
+        self._fila = []
+        self._ordem = itertools.count()
+        self._condicao = threading.Condition()
+
+    def adquirir(self, tokens, prioridade=0):
+        """Bloqueia até a chamada (com `tokens` estimados) caber nos limites; devolve os segundos de espera."""
+        if not self.baldes:
+            return 0.0
+        inicio = time.monotonic()
+        limite = inicio + self.espera_max
+        with self._condicao:
+            if len(self._fila) >= self.max_fila:
+                raise ErroFilaCheia()
+            ficha = (prioridade, next(self._ordem), sessao_atual.get())
+            heapq.heappush(self._fila, ficha)
+            try:
+                while True:
+                    agora = time.monotonic()
+                    espera = 1.0
+                    if self._fila[0] is ficha:
+                        espera = max(balde.espera(custo(tokens), agora) for balde, custo in self.baldes)
+                        if espera == 0:
+                            for balde, custo in self.baldes:
+                                balde.consumir(custo(tokens))
+                            return agora - inicio
+                    if agora >= limite:
+                        raise ErroFilaCheia()
+                    self._condicao.wait(min(espera, limite - agora, 1.0))
+            finally:
+                self._fila.remove(ficha)
+                heapq.heapify(self._fila)
+                self._condicao.notify_all()
+
+    def posicao(self, sessao):
+        """Melhor posição (1 = próxima) das chamadas da sessão na fila, ou None se nenhuma espera."""
+        with self._condicao:
+            for indice, ficha in enumerate(sorted(self._fila), 1):
+                if ficha[2] == sessao:
+                    return indice
+        return None
+
+    def tamanho_fila(self):
+        with self._condicao:
+            return len(self._fila)
+
+
+_limitador = None
+_limitador_lock = threading.Lock()
+
+
+def limitador_padrao():
+    """Limitador único por processo, dimensionado pelas variáveis de ambiente (0 desliga)."""
+    global _limitador
+    with _limitador_lock:
+        if _limitador is None:
+            _limitador = LimitadorTaxa(
+                rpm=int(os.getenv("LIMITE_RPM", "500")),
+                tpm=int(os.getenv("LIMITE_TPM", "500000")),
+                max_fila=int(os.getenv("LIMITE_MAX_FILA", "200")),
+                espera_max=float(os.getenv("LIMITE_ESPERA_MAX", "120")),
+            )
+        return _limitador
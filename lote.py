@@ -0,0 +1,308 @@
+"""Gera planos completos, sem interface, para uma planilha (CSV) de estudantes.
+
+Cada linha traz `area`, `ideia` e, opcionalmente, `tema` (e `aluno`, usado no
+nome do arquivo). A cadeia é a mesma do app: temas -> subtemas -> problemas ->
+objetivos -> Agentes 5 e 6 -> Markdown, escolhendo sempre a primeira sugestão
+de cada passo (e os primeiros objetivos). Cada plano concluído vira um .md
+(e um .pdf com --pdf) na pasta de saída.
+
+O progresso de cada linha fica salvo na pasta de saída: rodar de novo o mesmo
+comando pula os planos prontos e retoma os incompletos do passo em que pararam.
+
+    python lote.py turma.csv --saida planos --concorrencia 4 --pdf
+
+Com --lote-api os pedidos de cada etapa, de todas as linhas, vão num único
+job da Batch API da OpenAI (metade do preço, resultado em até 24h): bom para
+gerar a turma inteira de madrugada sem disputar o limite de requisições com
+os estudantes usando o app.
+
+    python lote.py turma.csv --saida planos --lote-api --pdf
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from agentes import (call_gpt, em_segundo_plano, gerar_lista, prompt_estrategia, prompt_objetivos,
+                     prompt_problemas, prompt_referencial, prompt_subtemas, prompt_temas)
+from api_lote import executar_lote
+from cache_llm import cache_padrao
+from exportacao import criar_pdf, gerar_conteudo_markdown
+from metricas import registro_padrao, sessao_atual
+from parser_listas import FORMATO_LISTA, ErroFormatoResposta, extrair_itens
+from resiliencia import ErroLLM
+from roteamento import roteador_padrao
+from sessoes import ArmazemSessoesSQLite
+
+
+def ler_planilha(caminho):
+    """Linhas do CSV como dicts {aluno, area, ideia, tema}; aceita "área" com acento."""
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+        linhas = []
+        for bruta in csv.DictReader(f, dialect=dialeto):
+            linha = {(k or "").strip().lower().replace("á", "a"): (v or "").strip() for k, v in bruta.items()}
+            if not linha.get("area") or not (linha.get("ideia") or linha.get("tema")):
+                continue
+            linhas.append({"aluno": linha.get("aluno", ""), "area": linha["area"],
+                           "ideia": linha.get("ideia", ""), "tema": linha.get("tema", "")})
+    return linhas
+
+
+def id_linha(linha):
+    """Id estável da linha (não muda se a planilha for reordenada)."""
+    chave = "\0".join((linha["aluno"], linha["area"], linha["ideia"], linha["tema"]))
+    return hashlib.sha256(chave.encode("utf-8")).hexdigest()[:16]
+
+
+def nome_arquivo(indice, linha):
+    base = linha["aluno"] or linha["tema"] or linha["ideia"]
+    base = unicodedata.normalize("NFKD", base).encode("ascii", "ignore").decode("ascii")
+    base = re.sub(r"[^A-Za-z0-9]+", "_", base).strip("_")[:50] or "plano"
+    return f"{indice:03d}_{base}"
+
+
+def _primeiro(itens):
+    return itens[0]["titulo"]
+
+
+def etapas(n_objetivos):
+    """Cadeia de agentes, etapa por etapa; os passos de uma mesma etapa são independentes.
+
+    Cada passo é (chave em `dados`, agente, prompt(linha, dados), escolha), onde
+    `escolha` converte a lista sugerida no valor guardado (None: texto livre).
+    """
+    def escolher_objetivos(itens):
+        return "\n".join(f"{i}. {obj['titulo']}" for i, obj in enumerate(itens[:n_objetivos], 1))
+
+    return [
+        [("tema_base", "temas", lambda l, d: prompt_temas(l["area"], l["ideia"]), _primeiro)],
+        [("tema_escolhido", "subtemas", lambda l, d: prompt_subtemas(l["area"], d["tema_base"]), _primeiro)],
+        [("problema_pesquisa", "problemas", lambda l, d: prompt_problemas(d["tema_escolhido"]), _primeiro)],
+        [("objetivos", "objetivos",
+          lambda l, d: prompt_objetivos(d["tema_escolhido"], d["problema_pesquisa"]), escolher_objetivos)],
+        # Agentes 5 e 6 em paralelo, como no app
+        [("ref_classicas", "referencial", lambda l, d: prompt_referencial(l["area"], d["tema_escolhido"]), None),
+         ("ref_atuais", "estrategia", lambda l, d: prompt_estrategia(d["tema_escolhido"]), None)],
+    ]
+
+
+def dados_iniciais(linha, id_plano, armazem):
+    """Progresso salvo da linha ou o ponto de partida (com o tema, se a planilha trouxer)."""
+    dados = armazem.carregar(id_plano)
+    if dados is None:
+        dados = {"area_usuario": linha["area"], "ideia_usuario": linha["ideia"]}
+        if linha["tema"]:
+            dados["tema_base"] = linha["tema"]
+    return dados
+
+
+def gerar_plano(linha, id_plano, armazem, n_objetivos):
+    """Percorre a cadeia de agentes retomando do último passo salvo; devolve `dados`."""
+    sessao_atual.set(id_plano)
+    dados = dados_iniciais(linha, id_plano, armazem)
+
+    def executar(agente, prompt, escolha):
+        if escolha is None:
+            return call_gpt(prompt, agente)
+        return escolha(gerar_lista(prompt, agente))
+
+    for etapa in etapas(n_objetivos):
+        pendentes = [passo for passo in etapa if passo[0] not in dados]
+        if not pendentes:
+            continue
+        with ThreadPoolExecutor(max_workers=len(pendentes)) as executor:
+            futuros = {chave: em_segundo_plano(executor, executar, agente, prompt(linha, dados), escolha)
+                       for chave, agente, prompt, escolha in pendentes}
+            erro = None
+            for chave, futuro in futuros.items():
+                try:
+                    dados[chave] = futuro.result()
+                except ErroLLM as e:
+                    erro = e
+        armazem.salvar(id_plano, dados)
+        if erro:
+            raise erro
+    registro_padrao().registrar_plano(id_plano)
+    return dados
+
+
+def gerar_planos_em_lote(linhas, armazem, n_objetivos, intervalo):
+    """Gera os planos etapa por etapa, com todos os pedidos de cada etapa num único job da Batch API.
+
+    Latência não importa aqui: cada etapa espera o lote anterior, mas o preço
+    por token cai pela metade e a capacidade interativa fica livre. Devolve
+    {id_plano: dados} dos planos que chegaram ao fim; os que falharam em
+    alguma etapa ficam salvos no passo em que pararam.
+    """
+    planos = {}
+    for linha in linhas:
+        id_plano = id_linha(linha)
+        planos[id_plano] = (linha, dados_iniciais(linha, id_plano, armazem))
+    cadeia = etapas(n_objetivos)
+    cache = cache_padrao()
+    roteador = roteador_padrao()
+
+    def aviso(lote):
+        print(f"  lote {lote.id}: {lote.status} ({lote.request_counts.completed}/{lote.request_counts.total})")
+
+    for numero, etapa in enumerate(cadeia, 1):
+        anteriores = [passo[0] for anterior in cadeia[:numero - 1] for passo in anterior]
+        pedidos, destinos, prontos, novos = {}, {}, {}, set()
+        for id_plano, (linha, dados) in planos.items():
+            # Planos que falharam numa etapa anterior ficam para a próxima execução
+            if any(chave not in dados for chave in anteriores):
+                continue
+            for chave, agente, prompt, escolha in etapa:
+                if chave in dados:
+                    continue
+                texto = prompt(linha, dados)
+                custom_id = f"{id_plano}:{chave}"
+                destinos[custom_id] = (id_plano, chave, agente, texto, escolha)
+                resposta = cache.obter(roteador.rota(agente)["modelo"], texto)
+                if resposta is not None and escolha:
+                    try:
+                        extrair_itens(resposta, minimo=1)
+                    except ErroFormatoResposta:
+                        # Lista malformada no cache: pede de novo em vez de falhar a cada execução
+                        resposta = None
+                if resposta is not None:
+                    prontos[custom_id] = resposta
+                else:
+                    pedidos.setdefault(agente, {})[custom_id] = (texto, FORMATO_LISTA if escolha else None)
+        if not destinos:
+            continue
+        print(f"Etapa {numero}: {sum(map(len, pedidos.values()))} pedidos em lote "
+              f"({len(prontos)} já no cache local).")
+        # Um job por agente: cada arquivo da Batch API aceita um único modelo.
+        # Sem pressa aqui, vale sempre o modelo principal da rota, sem reserva.
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, len(pedidos))) as executor:
+            futuros = {agente: executor.submit(executar_lote, pedidos_agente, roteador.rota(agente)["modelo"],
+                                               intervalo=intervalo, aviso=aviso,
+                                               parametros=roteador.parametros(agente))
+                       for agente, pedidos_agente in pedidos.items()}
+        duracao = time.monotonic() - inicio
+        for agente, futuro in futuros.items():
+            modelo = roteador.rota(agente)["modelo"]
+            try:
+                resultados = futuro.result()
+            except ErroLLM as e:
+                resultados = dict.fromkeys(pedidos[agente], e)
+            for custom_id, resultado in resultados.items():
+                id_plano, _, _, texto, _ = destinos[custom_id]
+                token = sessao_atual.set(id_plano)
+                if isinstance(resultado, ErroLLM):
+                    registro_padrao().registrar_chamada(f"{agente} (lote)", f"{modelo}:lote", duracao,
+                                                        erro=type(resultado).__name__)
+                    print(f"[falha] {custom_id}: {resultado}", file=sys.stderr)
+                else:
+                    registro_padrao().registrar_chamada(f"{agente} (lote)", f"{modelo}:lote", duracao,
+                                                        uso=resultado.usage)
+                    prontos[custom_id] = resultado.choices[0].message.content
+                    novos.add(custom_id)
+                sessao_atual.reset(token)
+        # Distribui as respostas de volta para os planos de cada estudante
+        for custom_id, resposta in prontos.items():
+            id_plano, chave, agente, texto, escolha = destinos[custom_id]
+            dados = planos[id_plano][1]
+            try:
+                dados[chave] = escolha(extrair_itens(resposta, minimo=1)) if escolha else resposta
+            except ErroFormatoResposta as e:
+                print(f"[falha] {custom_id}: {e}", file=sys.stderr)
+                continue
+            # Só vai para o cache a resposta que deu certo: uma malformada seria reaproveitada na próxima execução
+            if custom_id in novos:
+                cache.guardar(roteador.rota(agente)["modelo"], texto, resposta)
+        for id_plano in {destinos[c][0] for c in destinos}:
+            armazem.salvar(id_plano, planos[id_plano][1])
+
+    concluidos = {}
+    for id_plano, (linha, dados) in planos.items():
+        if all(passo[0] in dados for etapa in cadeia for passo in etapa):
+            registro_padrao().registrar_plano(id_plano)
+            concluidos[id_plano] = dados
+    return concluidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("planilha", help="CSV com as colunas area, ideia e, opcionalmente, tema e aluno")
+    parser.add_argument("--saida", default="planos", help="pasta dos planos gerados")
+    parser.add_argument("--concorrencia", type=int, default=4, help="planos gerados ao mesmo tempo")
+    parser.add_argument("--objetivos", type=int, default=4, help="quantos objetivos específicos manter")
+    parser.add_argument("--pdf", action="store_true", help="grava também o plano em PDF")
+    parser.add_argument("--lote-api", action="store_true",
+                        help="usa a Batch API (mais barata e sem pressa) em vez de chamadas interativas")
+    parser.add_argument("--intervalo", type=float, default=60.0,
+                        help="com --lote-api, segundos entre as consultas ao status de cada lote")
+    args = parser.parse_args()
+
+    load_dotenv()
+    os.makedirs(args.saida, exist_ok=True)
+    armazem = ArmazemSessoesSQLite(os.path.join(args.saida, "progresso.sqlite3"), ttl_dias=365)
+    linhas = ler_planilha(args.planilha)
+
+    pendentes = []
+    for indice, linha in enumerate(linhas, 1):
+        destino = os.path.join(args.saida, nome_arquivo(indice, linha))
+        if os.path.exists(destino + ".md") and (not args.pdf or os.path.exists(destino + ".pdf")):
+            continue
+        pendentes.append((indice, linha, destino))
+    print(f"{len(linhas)} linhas; {len(linhas) - len(pendentes)} planos já prontos, {len(pendentes)} a gerar.")
+
+    def gravar(dados, destino):
+        with open(destino + ".md", "w", encoding="utf-8") as f:
+            f.write(gerar_conteudo_markdown(dados))
+        if args.pdf:
+            with open(destino + ".pdf", "wb") as f:
+                f.write(criar_pdf(dados))
+
+    falhas = 0
+    if args.lote_api:
+        try:
+            concluidos = gerar_planos_em_lote([linha for _, linha, _ in pendentes], armazem,
+                                              args.objetivos, args.intervalo)
+        except ErroLLM as e:
+            print(f"[falha] {e.mensagem} ({e})", file=sys.stderr)
+            concluidos = {}
+        for indice, linha, destino in pendentes:
+            dados = concluidos.get(id_linha(linha))
+            if dados is None:
+                falhas += 1
+                print(f"[falha] linha {indice}: plano incompleto", file=sys.stderr)
+                continue
+            gravar(dados, destino)
+            print(f"[ok]    linha {indice}: {destino}.md")
+    else:
+        def processar(linha, destino):
+            gravar(gerar_plano(linha, id_linha(linha), armazem, args.objetivos), destino)
+
+        with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+            futuros = {executor.submit(processar, linha, destino): (indice, destino)
+                       for indice, linha, destino in pendentes}
+            for futuro in as_completed(futuros):
+                indice, destino = futuros[futuro]
+                try:
+                    futuro.result()
+                    print(f"[ok]    linha {indice}: {destino}.md")
+                except ErroLLM as e:
+                    falhas += 1
+                    print(f"[falha] linha {indice}: {e.mensagem} ({e})", file=sys.stderr)
+
+    print(f"Concluído: {len(pendentes) - falhas} gerados, {falhas} com falha."
+          + (" Rode de novo para retomar os que falharam." if falhas else ""))
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
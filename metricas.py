@@ -0,0 +1,172 @@
+import contextvars
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CAMINHO_PADRAO = ".cache/metricas.sqlite3"
+
+# Preço por milhão de tokens (entrada, entrada em cache, saída), em US$.
+# Valores de referência: ajuste aqui quando a tabela do provedor mudar.
+PRECOS_POR_MILHAO = {
+    "gpt-5.1": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+# Chamadas pela Batch API saem pela metade do preço; são registradas como "<modelo>:lote"
+DESCONTO_LOTE = 0.5
+
+# Sessão (plano) à qual as chamadas do contexto atual pertencem. As threads
+# de segundo plano herdam o valor via contextvars.copy_context().
+sessao_atual = contextvars.ContextVar("sessao_atual", default=None)
+
+
+def custo_estimado(modelo, tokens_prompt, tokens_resposta, tokens_cache=0):
+    """Custo em US$ de uma chamada (0 para modelos sem preço cadastrado)."""
+    modelo, _, modo = modelo.partition(":")
+    entrada, entrada_cache, saida = PRECOS_POR_MILHAO.get(modelo, (0, 0, 0))
+    custo = ((tokens_prompt - tokens_cache) * entrada + tokens_cache * entrada_cache
+             + tokens_resposta * saida) / 1_000_000
+    return custo * DESCONTO_LOTE if modo == "lote" else custo
+
+
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posto = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posto - 1]
+
+
+class RegistroMetricas:
+    """Grava uma linha por chamada ao modelo (e uma por plano concluído) em SQLite."""
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS chamadas (
+                               instante REAL NOT NULL,
+                               sessao TEXT,
+                               agente TEXT NOT NULL,
+                               modelo TEXT NOT NULL,
+                               tokens_prompt INTEGER NOT NULL DEFAULT 0,
+                               tokens_resposta INTEGER NOT NULL DEFAULT 0,
+                               tokens_cache INTEGER NOT NULL DEFAULT 0,
+                               duracao REAL NOT NULL,
+                               ttft REAL,
+                               cache_local INTEGER NOT NULL DEFAULT 0,
+                               erro TEXT)""")
+            con.execute("""CREATE TABLE IF NOT EXISTS planos (
+                               sessao TEXT PRIMARY KEY,
+                               instante REAL NOT NULL)""")
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def registrar_chamada(self, agente, modelo, duracao, ttft=None, uso=None, cache_local=False, erro=None):
+        """Registra uma chamada. `uso` é o `response.usage` devolvido pela API."""
+        tokens_prompt = getattr(uso, "prompt_tokens", 0) or 0
+        tokens_resposta = getattr(uso, "completion_tokens", 0) or 0
+        detalhes = getattr(uso, "prompt_tokens_details", None)
+        tokens_cache = getattr(detalhes, "cached_tokens", 0) or 0
+        with self._lock, self._conectar() as con:
+            con.execute("INSERT INTO chamadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (time.time(), sessao_atual.get(), agente, modelo, tokens_prompt,
+                         tokens_resposta, tokens_cache, duracao, ttft, int(cache_local), erro))
+
+    def registrar_plano(self, sessao):
+        with self._lock, self._conectar() as con:
+            con.execute("INSERT OR IGNORE INTO planos VALUES (?, ?)", (sessao, time.time()))
+
+    def _linhas(self, desde):
+        with self._conectar() as con:
+            return con.execute("""SELECT sessao, agente, modelo, tokens_prompt, tokens_resposta,
+                                         tokens_cache, duracao, ttft, cache_local, erro
+                                  FROM chamadas WHERE instante >= ?""", (desde,)).fetchall()
+
+    def resumo_por_agente(self, desde=0):
+        """Latência (p50/p95), TTFT, tokens e custo agregados por agente."""
+        grupos = {}
+        for sessao, agente, modelo, tp, tr, tc, duracao, ttft, cache_local, erro in self._linhas(desde):
+            g = grupos.setdefault(agente, {"duracoes": [], "ttfts": [], "chamadas": 0, "cache_local": 0,
+                                           "erros": 0, "tokens_prompt": 0, "tokens_resposta": 0,
+                                           "tokens_cache": 0, "custo": 0.0})
+            g["chamadas"] += 1
+            g["cache_local"] += cache_local
+            if erro:
+                g["erros"] += 1
+                continue
+            g["duracoes"].append(duracao)
+            if ttft is not None:
+                g["ttfts"].append(ttft)
+            g["tokens_prompt"] += tp
+            g["tokens_resposta"] += tr
+            g["tokens_cache"] += tc
+            g["custo"] += custo_estimado(modelo, tp, tr, tc)
+        resumo = []
+        for agente, g in sorted(grupos.items()):
+            # Fração da entrada servida pelo cache de prompts do provedor
+            cache_prompt = 100 * g["tokens_cache"] / g["tokens_prompt"] if g["tokens_prompt"] else None
+            resumo.append({
+                "agente": agente,
+                "chamadas": g["chamadas"],
+                "acertos_cache_local": g["cache_local"],
+                "erros": g["erros"],
+                "latencia_p50_s": percentil(g["duracoes"], 50),
+                "latencia_p95_s": percentil(g["duracoes"], 95),
+                "ttft_p50_s": percentil(g["ttfts"], 50),
+                "tokens_prompt": g["tokens_prompt"],
+                "tokens_cache": g["tokens_cache"],
+                "cache_prompt_pct": round(cache_prompt, 1) if cache_prompt is not None else None,
+                "tokens_resposta": g["tokens_resposta"],
+                "custo_usd": round(g["custo"], 4),
+            })
+        return resumo
+
+    def resumo_por_plano(self, desde=0):
+        """Custo e tempo de espera total por plano concluído (p50/p95)."""
+        with self._conectar() as con:
+            concluidos = {s for (s,) in con.execute("SELECT sessao FROM planos WHERE instante >= ?", (desde,))}
+        custos, esperas = {}, {}
+        for sessao, agente, modelo, tp, tr, tc, duracao, ttft, cache_local, erro in self._linhas(desde):
+            if sessao not in concluidos:
+                continue
+            custos[sessao] = custos.get(sessao, 0.0) + custo_estimado(modelo, tp, tr, tc)
+            esperas[sessao] = esperas.get(sessao, 0.0) + duracao
+        return {
+            "planos": len(concluidos),
+            "custo_p50_usd": percentil(list(custos.values()), 50),
+            "custo_p95_usd": percentil(list(custos.values()), 95),
+            "custo_total_usd": round(sum(custos.values()), 4),
+            "espera_llm_p50_s": percentil(list(esperas.values()), 50),
+            "espera_llm_p95_s": percentil(list(esperas.values()), 95),
+        }
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def registro_padrao():
+    """Instância única por processo (caminho em METRICAS_CAMINHO)."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroMetricas(os.getenv("METRICAS_CAMINHO", CAMINHO_PADRAO))
+        return _registro
@@ -0,0 +1,39 @@
+import time
+
+import streamlit as st
+
+from metricas import registro_padrao
+
+PERIODOS = {
+    "Última hora": 3600,
+    "Últimas 24 horas": 24 * 3600,
+    "Últimos 7 dias": 7 * 24 * 3600,
+    "Tudo": None,
+}
+
+
+def exibir_painel():
+    """Página de administração com latência e custo por agente e por plano."""
+    st.header("Painel de Métricas (administração)")
+    periodo = st.selectbox("Período", list(PERIODOS), index=1)
+    segundos = PERIODOS[periodo]
+    desde = time.time() - segundos if segundos else 0
+    registro = registro_padrao()
+
+    st.subheader("Por plano concluído")
+    plano = registro.resumo_por_plano(desde)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Planos concluídos", plano["planos"])
+    c2.metric("Custo total (US$)", f"{plano['custo_total_usd']:.4f}")
+    c3.metric("Custo p50 / p95 (US$)",
+              f"{plano['custo_p50_usd'] or 0:.4f} / {plano['custo_p95_usd'] or 0:.4f}")
+    c4.metric("Espera no modelo p50 / p95 (s)",
+              f"{plano['espera_llm_p50_s'] or 0:.1f} / {plano['espera_llm_p95_s'] or 0:.1f}",
+              help="Soma do tempo das chamadas do plano (chamadas em paralelo contam em dobro).")
+
+    st.subheader("Por agente")
+    resumo = registro.resumo_por_agente(desde)
+    if resumo:
+        st.dataframe(resumo)
+    else:
+        st.info("Nenhuma chamada registrada no período.")
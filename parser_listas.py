@@ -0,0 +1,106 @@
+import json
+import re
+
+from resiliencia import ErroLLM
+
+# Estrutura pedida aos agentes que geram listas (passos 1 a 4)
+SCHEMA_LISTA = {
+    "type": "object",
+    "properties": {
+        "itens": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "titulo": {"type": "string"},
+                    "justificativa": {"type": "string"},
+                },
+                "required": ["titulo", "justificativa"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["itens"],
+    "additionalProperties": False,
+}
+
+FORMATO_LISTA = {
+    "type": "json_schema",
+    "json_schema": {"name": "lista_sugestoes", "strict": True, "schema": SCHEMA_LISTA},
+}
+
+_NUMERACAO = re.compile(r"^\s*(?:\d{1,2}\s*[.)\-:]|[-*•])\s*")
+
+
+class ErroFormatoResposta(ErroLLM):
+    mensagem = "O orientador IA devolveu uma resposta em formato inesperado. Tente novamente."
+
+
+def _carregar_json(texto):
+    """Lê o JSON da resposta, tolerando blocos ```json e texto em volta."""
+    texto = texto.strip()
+    texto = re.sub(r"^```(?:json)?\s*|\s*```$", "", texto)
+    try:
+        return json.loads(texto)
+    except ValueError:
+        pass
+    # Reparo: pega o maior trecho entre chaves ou colchetes
+    for abre, fecha in (("{", "}"), ("[", "]")):
+        inicio, fim = texto.find(abre), texto.rfind(fecha)
+        if inicio != -1 and fim > inicio:
+            try:
+                return json.loads(texto[inicio:fim + 1])
+            except ValueError:
+                continue
+    return None
+
+
+def _itens_de_linhas(texto):
+    """Reparo para respostas em lista numerada ("1. **Título**: justificativa")."""
+    itens = []
+    for linha in texto.splitlines():
+        if not _NUMERACAO.match(linha):
+            continue
+        conteudo = _NUMERACAO.sub("", linha, count=1).strip().rstrip(";")
+        titulo, _, justificativa = conteudo.partition(":") if "**" in conteudo else (conteudo, "", "")
+        itens.append({"titulo": titulo, "justificativa": justificativa})
+    return itens
+
+
+def _normalizar(item):
+    if isinstance(item, str):
+        item = {"titulo": item}
+    if not isinstance(item, dict):
+        return None
+    titulo = str(item.get("titulo") or "").replace("**", "").strip().strip('"').strip()
+    titulo = _NUMERACAO.sub("", titulo, count=1)
+    if not titulo:
+        return None
+    return {"titulo": titulo, "justificativa": str(item.get("justificativa") or "").strip()}
+
+
+def extrair_itens(texto, quantidade=10, minimo=None):
+    """Converte a resposta do modelo em uma lista de {titulo, justificativa}.
+
+    Aceita o JSON do formato estruturado e, como reparo, JSON malformado ou uma
+    lista numerada em texto. Remove itens vazios e títulos repetidos e corta
+    em `quantidade`. Levanta ErroFormatoResposta se sobrarem menos de `minimo`
+    itens (por padrão, `quantidade`).
+    """
+    minimo = quantidade if minimo is None else minimo
+    dados = _carregar_json(texto)
+    if isinstance(dados, dict):
+        dados = dados.get("itens")
+    brutos = dados if isinstance(dados, list) else _itens_de_linhas(texto)
+
+    itens, vistos = [], set()
+    for bruto in brutos:
+        item = _normalizar(bruto)
+        if item is None or item["titulo"].lower() in vistos:
+            continue
+        vistos.add(item["titulo"].lower())
+        itens.append(item)
+
+    if len(itens) < minimo:
+        raise ErroFormatoResposta(f"esperados {minimo} itens, recebidos {len(itens)}")
+    return itens[:quantidade]
@@ -0,0 +1,159 @@
+import os
+import random
+import threading
+import time
+
+
+class ErroLLM(Exception):
+    """Falha ao obter resposta do modelo. O texto do erro nunca deve ir para `dados`."""
+
+    mensagem = "Não foi possível obter resposta do orientador IA. Tente novamente."
+
+
+class ErroTempoEsgotado(ErroLLM):
+    mensagem = "O orientador IA demorou demais para responder. Tente novamente."
+
+
+class ErroLimiteRequisicoes(ErroLLM):
+    mensagem = "Muitas solicitações ao mesmo tempo. Aguarde alguns segundos e tente novamente."
+
+
+class ErroServidor(ErroLLM):
+    mensagem = "O serviço de IA está instável no momento. Tente novamente em instantes."
+
+
+class ErroCircuitoAberto(ErroLLM):
+    mensagem = "O serviço de IA está indisponível no momento. Tente novamente em alguns segundos."
+
+
+class ErroRequisicao(ErroLLM):
+    mensagem = "A solicitação ao orientador IA foi recusada. Revise os dados informados."
+
+
+class DisjuntorCircuito:
+    """Circuit breaker compartilhado por todas as sessões do processo.
+
+    Depois de `limite_falhas` falhas seguidas do serviço, as chamadas falham
+    na hora por `tempo_aberto` segundos. Passado esse tempo, uma chamada de
+    teste é liberada: se der certo o circuito fecha, se falhar reabre.
+    """
+
+    def __init__(self, limite_falhas=5, tempo_aberto=30):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self._falhas < self.limite_falhas:
+                return True
+            agora = time.monotonic()
+            if agora >= self._aberto_ate:
+                # Meio-aberto: deixa passar uma chamada de teste e segura as demais
+                self._aberto_ate = agora + self.tempo_aberto
+                return True
+            return False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+
+
+_disjuntor = None
+_disjuntor_lock = threading.Lock()
+
+
+def obter_disjuntor():
+    """Disjuntor único por processo, configurado pelas variáveis de ambiente."""
+    global _disjuntor
+    with _disjuntor_lock:
+        if _disjuntor is None:
+            _disjuntor = DisjuntorCircuito(
+                limite_falhas=int(os.getenv("DISJUNTOR_LIMITE_FALHAS", "5")),
+                tempo_aberto=float(os.getenv("DISJUNTOR_TEMPO_ABERTO", "30")),
+            )
+        return _disjuntor
+
+
+def _espera_sugerida(erro):
+    # Respeita o cabeçalho Retry-After das respostas 429, quando existir
+    try:
+        return float(erro.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def chamar_com_resiliencia(fazer_chamada, timeout, tentativas=3, espera_base=1.0,
+                           espera_max=20.0, disjuntor=None, tempo_e_falha=True):
+    """Executa `fazer_chamada(timeout)` com retentativas e circuit breaker.
+
+    Erros 429, 5xx, de conexão e de tempo esgotado são repetidos com espera
+    exponencial e jitter; os demais falham na hora. Sempre levanta uma
+    subclasse de ErroLLM. Com `tempo_e_falha` falso, o tempo esgotado não
+    conta no disjuntor: o `timeout` é só o orçamento de latência de um modelo
+    que tem reserva, e não sinal de que o serviço caiu.
+    """
+    # Importado só na primeira chamada: o SDK pesa na carga do app
+    import openai
+
+    disjuntor = disjuntor or obter_disjuntor()
+    for tentativa in range(tentativas):
+        if not disjuntor.permitir():
+            raise ErroCircuitoAberto()
+        espera = None
+        try:
+            resultado = fazer_chamada(timeout)
+        except openai.APITimeoutError as e:
+            if tempo_e_falha:
+                disjuntor.registrar_falha()
+            erro, causa = ErroTempoEsgotado(), e
+        except openai.RateLimitError as e:
+            erro, causa = ErroLimiteRequisicoes(), e
+            espera = _espera_sugerida(e)
+        except (openai.InternalServerError, openai.APIConnectionError) as e:
+            disjuntor.registrar_falha()
+            erro, causa = ErroServidor(), e
+        except openai.APIStatusError as e:
+            if e.status_code < 500:
+                raise ErroRequisicao(str(e)) from e
+            disjuntor.registrar_falha()
+            erro, causa = ErroServidor(), e
+        else:
+            disjuntor.registrar_sucesso()
+            return resultado
+
+        if tentativa == tentativas - 1:
+            raise erro from causa
+        if espera is None:
+            # Backoff exponencial com "full jitter"
+            espera = random.uniform(0, min(espera_max, espera_base * 2 ** tentativa))
+        time.sleep(min(espera, espera_max))
+
+
+def iterar_stream(stream, disjuntor=None, tempo_e_falha=True):
+    """Percorre um stream de chat, convertendo falhas no meio da resposta em ErroLLM.
+
+    `tempo_e_falha` como em chamar_com_resiliencia.
+    """
+    import httpx
+    import openai
+
+    disjuntor = disjuntor or obter_disjuntor()
+    try:
+        for chunk in stream:
+            yield chunk
+    except (openai.APIError, httpx.HTTPError) as e:
+        tempo_esgotado = isinstance(e, (openai.APITimeoutError, httpx.TimeoutException))
+        if tempo_e_falha or not tempo_esgotado:
+            disjuntor.registrar_falha()
+        if tempo_esgotado:
+            raise ErroTempoEsgotado() from e
+        raise ErroServidor() from e
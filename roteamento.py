@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Rota de cada agente:
+# - modelo / reserva: modelo principal e um mais rápido para quando o orçamento corre risco
+# - max_tokens: limite de tokens de saída (max_completion_tokens)
+# - orcamento: segundos que o estudante deve esperar no máximo; para os agentes em
+#   streaming conta até o primeiro trecho aparecer, para os demais a resposta inteira
+# - timeout: prazo de cada tentativa no modelo reserva (ou no principal, sem reserva)
+# - esforco: reasoning_effort, só para modelos de raciocínio (vale também para a reserva)
+# - prioridade: na fila do limitador de taxa, menor passa na frente (listas curtas antes
+#   dos textos longos dos Agentes 5 e 6)
+ROTAS_PADRAO = {
+    "temas": {"modelo": "gpt-5-mini", "reserva": "gpt-5-nano", "max_tokens": 4000,
+              "orcamento": 20, "timeout": 60, "esforco": "minimal", "prioridade": 0},
+    "subtemas": {"modelo": "gpt-5-mini", "reserva": "gpt-5-nano", "max_tokens": 4000,
+                 "orcamento": 25, "timeout": 90, "esforco": "minimal", "prioridade": 0},
+    "problemas": {"modelo": "gpt-5-mini", "reserva": "gpt-5-nano", "max_tokens": 4000,
+                  "orcamento": 20, "timeout": 60, "esforco": "minimal", "prioridade": 0},
+    "objetivos": {"modelo": "gpt-5-mini", "reserva": "gpt-5-nano", "max_tokens": 8000,
+                  "orcamento": 45, "timeout": 120, "esforco": "minimal", "prioridade": 0},
+    "referencial": {"modelo": "gpt-5.1", "reserva": "gpt-5-mini", "max_tokens": 8000,
+                    "orcamento": 15, "timeout": 240, "esforco": None, "prioridade": 1},
+    "estrategia": {"modelo": "gpt-5.1", "reserva": "gpt-5-mini", "max_tokens": 8000,
+                   "orcamento": 15, "timeout": 240, "esforco": None, "prioridade": 1},
+}
+
+
+def carregar_rotas(configuracao=None):
+    """Rotas padrão com os ajustes de `configuracao` (JSON ou caminho de um arquivo JSON).
+
+    Só é preciso informar o que muda, por exemplo
+    {"temas": {"modelo": "gpt-4o-mini", "reserva": null, "esforco": null}}.
+    """
+    rotas = {agente: dict(rota) for agente, rota in ROTAS_PADRAO.items()}
+    if not configuracao:
+        return rotas
+    if not configuracao.lstrip().startswith("{"):
+        with open(configuracao, encoding="utf-8") as f:
+            configuracao = f.read()
+    for agente, ajustes in json.loads(configuracao).items():
+        if agente not in rotas:
+            raise ValueError(f"ROTAS_AGENTES: agente desconhecido: {agente} (opções: {', '.join(rotas)})")
+        rotas[agente].update(ajustes)
+    return rotas
+
+
+class Roteador:
+    """Escolhe o modelo de cada chamada pela rota do agente e pela latência recente.
+
+    Guarda as latências dos últimos `janela` segundos por (agente, modelo). Se
+    a mediana recente do modelo principal já estoura o orçamento, a chamada
+    vai direto para a reserva; passada a janela, o principal volta a ser
+    testado. Quando o principal é tentado e há reserva, ele tem só o orçamento
+    (e uma tentativa) antes de a chamada passar para a reserva.
+    """
+
+    def __init__(self, rotas, janela=300, minimo_amostras=3):
+        self.rotas = rotas
+        self.janela = janela
+        self.minimo_amostras = minimo_amostras
+        self._latencias = {}
+        self._lock = threading.Lock()
+
+    def rota(self, agente):
+        return self.rotas[agente]
+
+    def registrar(self, agente, modelo, duracao):
+        """Latência observada (ou o orçamento esgotado) de uma chamada."""
+        with self._lock:
+            self._latencias.setdefault((agente, modelo), deque(maxlen=50)).append((time.monotonic(), duracao))
+
+    def em_risco(self, agente):
+        rota = self.rotas[agente]
+        limite = time.monotonic() - self.janela
+        with self._lock:
+            recentes = [d for instante, d in self._latencias.get((agente, rota["modelo"]), ()) if instante >= limite]
+        if len(recentes) < self.minimo_amostras:
+            return False
+        return sorted(recentes)[len(recentes) // 2] >= rota["orcamento"]
+
+    def plano(self, agente):
+        """Tentativas da chamada, em ordem: [(modelo, timeout, tentativas, tempo_e_falha), ...].
+
+        `tempo_e_falha` é falso quando o timeout é o orçamento do principal antes
+        da reserva: estourá-lo não deve abrir o disjuntor, que é de todos os modelos.
+        """
+        rota = self.rotas[agente]
+        reserva = rota.get("reserva")
+        if not reserva:
+            return [(rota["modelo"], rota["timeout"], 3, True)]
+        if self.em_risco(agente):
+            return [(reserva, rota["timeout"], 3, True)]
+        return [(rota["modelo"], min(rota["orcamento"], rota["timeout"]), 1, False),
+                (reserva, rota["timeout"], 3, True)]
+
+    def parametros(self, agente):
+        """Argumentos extras do chat.completions.create para o agente."""
+        rota = self.rotas[agente]
+        extras = {"max_completion_tokens": rota["max_tokens"]}
+        if rota.get("esforco"):
+            extras["reasoning_effort"] = rota["esforco"]
+        return extras
+
+
+_roteador = None
+_roteador_lock = threading.Lock()
+
+
+def roteador_padrao():
+    """Roteador único por processo; ajuste as rotas com ROTAS_AGENTES (JSON ou arquivo)."""
+    global _roteador
+    with _roteador_lock:
+        if _roteador is None:
+            _roteador = Roteador(
+                carregar_rotas(os.getenv("ROTAS_AGENTES")),
+                janela=float(os.getenv("ROTAS_JANELA_SEGUNDOS", "300")),
+            )
+        return _roteador
@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from conexao_redis import cliente_redis, prefixo_redis
+
+CAMINHO_PADRAO = ".cache/sessoes.sqlite3"
+
+
+def compactar(estado):
+    """Serializa o estado da sessão em JSON comprimido (zlib)."""
+    return zlib.compress(json.dumps(estado, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def descompactar(dados):
+    return json.loads(zlib.decompress(dados).decode("utf-8"))
+
+
+class ArmazemSessoes(ABC):
+    """Interface dos armazéns de sessão: guarda o progresso de cada plano pelo id.
+
+    Um backend sem algum dos métodos falha já ao ser criado, não no meio da
+    sessão de um estudante.
+    """
+
+    @abstractmethod
+    def salvar(self, id_sessao, estado):
+        pass
+
+    @abstractmethod
+    def carregar(self, id_sessao):
+        """Devolve o estado salvo ou None se não existir ou tiver expirado."""
+
+    @abstractmethod
+    def remover(self, id_sessao):
+        pass
+
+
+class ArmazemSessoesMemoria(ArmazemSessoes):
+    """Armazém no próprio processo: não sobrevive a reinícios (útil em testes)."""
+
+    def __init__(self, ttl_dias=30):
+        self.ttl = ttl_dias * 86400
+        self._sessoes = {}
+        self._lock = threading.Lock()
+
+    def salvar(self, id_sessao, estado):
+        with self._lock:
+            self._sessoes[id_sessao] = (compactar(estado), time.time())
+
+    def carregar(self, id_sessao):
+        with self._lock:
+            salvo = self._sessoes.get(id_sessao)
+        if salvo is None or time.time() - salvo[1] > self.ttl:
+            return None
+        return descompactar(salvo[0])
+
+    def remover(self, id_sessao):
+        with self._lock:
+            self._sessoes.pop(id_sessao, None)
+
+
+class ArmazemSessoesSQLite(ArmazemSessoes):
+    """Armazém em disco (SQLite), com o estado comprimido e expiração após `ttl_dias`."""
+
+    def __init__(self, caminho=CAMINHO_PADRAO, ttl_dias=30):
+        self.caminho = caminho
+        self.ttl = ttl_dias * 86400
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS sessoes (
+                               id TEXT PRIMARY KEY,
+                               estado BLOB NOT NULL,
+                               atualizado REAL NOT NULL)""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_atualizado ON sessoes (atualizado)")
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def salvar(self, id_sessao, estado):
+        agora = time.time()
+        with self._lock, self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO sessoes VALUES (?, ?, ?)", (id_sessao, compactar(estado), agora))
+            con.execute("DELETE FROM sessoes WHERE atualizado < ?", (agora - self.ttl,))
+
+    def carregar(self, id_sessao):
+        with self._lock, self._conectar() as con:
+            linha = con.execute("SELECT estado, atualizado FROM sessoes WHERE id = ?", (id_sessao,)).fetchone()
+        if linha is None or time.time() - linha[1] > self.ttl:
+            return None
+        return descompactar(linha[0])
+
+    def remover(self, id_sessao):
+        with self._lock, self._conectar() as con:
+            con.execute("DELETE FROM sessoes WHERE id = ?", (id_sessao,))
+
+
+class ArmazemSessoesRedis(ArmazemSessoes):
+    """Armazém num servidor Redis: qualquer réplica do app retoma o plano de qualquer outra.
+
+    O estado vai comprimido como nos demais armazéns e a expiração fica com o
+    próprio servidor (renovada a cada gravação).
+    """
+
+    def __init__(self, cliente, prefixo="orientador", ttl_dias=30):
+        self.cliente = cliente
+        self.prefixo = f"{prefixo}:sessao:"
+        self.ttl = int(ttl_dias * 86400)
+
+    def salvar(self, id_sessao, estado):
+        self.cliente.set(self.prefixo + id_sessao, compactar(estado), ex=self.ttl)
+
+    def carregar(self, id_sessao):
+        dados = self.cliente.get(self.prefixo + id_sessao)
+        return None if dados is None else descompactar(dados)
+
+    def remover(self, id_sessao):
+        self.cliente.delete(self.prefixo + id_sessao)
+
+
+# Backends disponíveis em SESSOES_BACKEND
+BACKENDS = {
+    "sqlite": lambda ttl_dias: ArmazemSessoesSQLite(os.getenv("SESSOES_CAMINHO", CAMINHO_PADRAO), ttl_dias),
+    "memoria": lambda ttl_dias: ArmazemSessoesMemoria(ttl_dias),
+    "redis": lambda ttl_dias: ArmazemSessoesRedis(cliente_redis(), prefixo_redis(), ttl_dias),
+}
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def armazem_padrao():
+    """Instância única por processo, escolhida por SESSOES_BACKEND (padrão: sqlite)."""
+    global _armazem
+    with _armazem_lock:
+        if _armazem is None:
+            backend = os.getenv("SESSOES_BACKEND", "sqlite")
+            if backend not in BACKENDS:
+                raise ValueError(f"SESSOES_BACKEND desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+            _armazem = BACKENDS[backend](float(os.getenv("SESSOES_TTL_DIAS", "30")))
+        return _armazem
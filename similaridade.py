@@ -0,0 +1,85 @@
+import re
+import unicodedata
+
+# Palavras sem peso para comparar títulos acadêmicos em português
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das", "dos",
+    "em", "na", "no", "nas", "nos", "para", "por", "pela", "pelo", "pelas", "pelos",
+    "com", "sem", "sobre", "entre", "e", "ou", "que", "se", "ao", "aos", "à", "às",
+    "seu", "sua", "seus", "suas", "como", "uma", "revisao", "integrativa", "literatura",
+    "estudo", "analise", "perspectiva", "perspectivas", "abordagem",
+}
+
+# Os títulos de uma mesma página repetem a ideia do estudante ("Burnout em
+# enfermeiros de UTI ..."): recortes diferentes dela ficam entre 0,5 e 0,7,
+# reescritas do mesmo título acima de 0,8
+LIMIAR_PADRAO = 0.75
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos, pontuação nem palavras vazias."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    palavras = re.findall(r"[a-z0-9]+", texto)
+    return " ".join(p for p in palavras if p not in STOPWORDS)
+
+
+def ngramas(texto, n=3):
+    """Conjunto de n-gramas de caracteres do texto normalizado."""
+    texto = normalizar(texto)
+    if len(texto) <= n:
+        return {texto} if texto else set()
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+def similaridade(a, b):
+    """Similaridade de Jaccard entre os n-gramas de dois textos (0 a 1)."""
+    ga, gb = ngramas(a), ngramas(b)
+    if not ga or not gb:
+        return 0.0
+    return len(ga & gb) / len(ga | gb)
+
+
+def filtrar_quase_duplicatas(novos, ja_vistos=(), limiar=LIMIAR_PADRAO):
+    """Devolve os itens de `novos` que não são quase iguais entre si nem a `ja_vistos`.
+
+    Com poucas dezenas de títulos por sessão, a comparação exata dos n-gramas
+    é barata e dispensa aproximações como MinHash.
+
+    Recortes de população ou contexto continuam; reescritas caem
+    (confira com python -m doctest similaridade.py):
+
+    >>> filtrar_quase_duplicatas([
+    ...     "Burnout em enfermeiros de UTI adulto",
+    ...     "Burnout em enfermeiros de UTI neonatal",
+    ...     "Burnout em enfermeiros de UTI pediátrica",
+    ...     "Burnout em enfermeiros da UTI adulta",
+    ...     "Burnout entre enfermeiros de UTIs adulto",
+    ... ])
+    ['Burnout em enfermeiros de UTI adulto', 'Burnout em enfermeiros de UTI neonatal', 'Burnout em enfermeiros de UTI pediátrica']
+    """
+    referencias = [ngramas(t) for t in ja_vistos]
+    unicos = []
+    for texto in novos:
+        grams = ngramas(texto)
+        if not grams:
+            continue
+        if any(len(grams & ref) / len(grams | ref) >= limiar for ref in referencias if ref):
+            continue
+        referencias.append(grams)
+        unicos.append(texto)
+    return unicos
+
+
+def resumo_exclusao(textos, max_palavras=6):
+    """Resumo compacto dos títulos já exibidos, para o pedido de "não repita".
+
+    Cada título vira suas primeiras palavras significativas; resumos repetidos
+    são enviados uma única vez.
+    """
+    resumos = []
+    for texto in textos:
+        resumo = " ".join(normalizar(texto).split()[:max_palavras])
+        if resumo and resumo not in resumos:
+            resumos.append(resumo)
+    return "; ".join(resumos)